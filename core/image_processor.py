@@ -1,23 +1,34 @@
 """
 Image processing operations and executor
 """
-import math
+import os
 import numpy as np
-from PIL import Image, ImageOps, ImageFilter, ImageDraw
-from typing import Optional
+from PIL import Image, ImageOps, ImageFilter
+from typing import Callable, Dict, Optional, Tuple
 from core.process import Process, Operation
 
 
+class ProcessCancelled(Exception):
+    """Raised when a process run is cancelled between operations"""
+
+
 class ImageProcessor:
     """Executes a process on an image"""
 
+    BORDER_TEXTURES = ("solid", "gradient", "ribbed", "dotted", "wave", "crosshatch")
+    AFFINE_BLOCK_PIXELS = 1 << 16  # 256 KB of float32 output per block
+
     def __init__(self):
         self.current_image: Optional[Image.Image] = None
         self.height_map: Optional[np.ndarray] = None
         self.angle: float = 75.0  # Build angle in degrees
         self.pixel_size_mm: float = 0.5  # Physical size of each pixel (1/pixels_per_mm)
+        self._dist_cache: Dict[Tuple[int, int], np.ndarray] = {}  # Edge-distance maps by (h, w)
+        self._mask_cache: Dict[Tuple[int, int, int], np.ndarray] = {}  # Border masks by (h, w, width)
+        self._decoded: Optional[Tuple[tuple, Image.Image]] = None  # Last decoded source by (path, mtime, size, mode)
 
-    def execute_process(self, image_path: str, process: Process, crop_rect: tuple = None) -> np.ndarray:
+    def execute_process(self, image_path: str, process: Process, crop_rect: tuple = None,
+                        cancel_check: Callable[[], bool] = None) -> np.ndarray:
         """
         Execute all operations in a process on an image
         Returns the final height map as a numpy array
@@ -27,21 +38,68 @@ class ImageProcessor:
             process: Process containing operations to execute
             crop_rect: Optional tuple (x, y, w, h) with normalized coordinates (0-1)
                        for cropping before processing
+            cancel_check: Optional callable polled before each operation; when it
+                          returns True the run stops with ProcessCancelled
         """
-        # Load the image
+        # Open the image (only the header is read here)
         self.current_image = Image.open(image_path)
 
+        # Let the decoder skip resolution the process will throw away
+        self._apply_draft(process, crop_rect)
+
+        # Reuse the previous decode while the file and decode scale are unchanged
+        key = (image_path, os.stat(image_path).st_mtime_ns, self.current_image.size, self.current_image.mode)
+        if self._decoded is not None and self._decoded[0] == key:
+            self.current_image.close()
+            self.current_image = self._decoded[1]
+        else:
+            self.current_image.load()
+            self._decoded = (key, self.current_image)
+
         # Apply crop if specified
         if crop_rect is not None:
             self._apply_crop(crop_rect)
 
         # Execute each operation in sequence
         for operation in process.operations:
+            if cancel_check is not None and cancel_check():
+                raise ProcessCancelled()
             self._execute_operation(operation)
 
         # Return the height map
         return self.height_map
 
+    def _apply_draft(self, process: Process, crop_rect: tuple = None):
+        """
+        Configure the decoder to load the image at a reduced scale when possible.
+
+        For JPEGs this makes libjpeg decode at 1/2, 1/4 or 1/8 resolution while
+        still yielding at least as many pixels as the lithophane resize needs.
+        Other formats ignore the request.
+
+        Args:
+            process: Process whose lithophane parameters determine the target size
+            crop_rect: Optional tuple (x, y, w, h) with normalized coordinates (0-1)
+        """
+        for operation in process.operations:
+            if operation.type == "set_lithophane_parameters":
+                params = operation.parameters
+                break
+        else:
+            return
+
+        pixels_per_mm = params.get("pixels_per_mm", 2.0)
+        target_width = params.get("width_mm", 100.0) * pixels_per_mm
+        target_height = params.get("height_mm", 100.0) * pixels_per_mm
+
+        # The crop keeps only a fraction of the decoded image, so ask for more
+        if crop_rect is not None:
+            _, _, w, h = crop_rect
+            target_width /= max(w, 1e-6)
+            target_height /= max(h, 1e-6)
+
+        self.current_image.draft(None, (int(np.ceil(target_width)), int(np.ceil(target_height))))
+
     def _apply_crop(self, crop_rect: tuple):
         """
         Apply crop to the current image.
@@ -87,9 +145,9 @@ class ImageProcessor:
         """
         Set lithophane physical dimensions and convert image to height map
         This operation simultaneously:
-        1. Crops or pads the image based on crop_mode
-        2. Scales the image to match the specified physical dimensions
-        3. Converts to grayscale
+        1. Converts to grayscale
+        2. Crops or pads the image based on crop_mode
+        3. Scales the image to match the specified physical dimensions
         4. Converts the image to a height map with min/max thickness
         """
         # Get parameters
@@ -113,214 +171,273 @@ class ImageProcessor:
         # N pixels = N-1 gaps, so to span width_mm we need width_mm/(N-1) per gap
         self.pixel_size_mm = width_mm / (target_width_pixels - 1)
 
+        # Convert to grayscale first so padding and resampling touch a single band
+        self.current_image = ImageOps.grayscale(self.current_image)
+
         # Calculate aspect ratios
         target_aspect = width_mm / height_mm
         src_width, src_height = self.current_image.size
         src_aspect = src_width / src_height
 
         if crop_mode == "crop_to_size":
-            # Crop to match target aspect ratio, then resize
+            # Crop to match target aspect ratio. An explicit crop, not resize(box=...):
+            # Lanczos would still read the cropped-away pixels around the box
+            box = None
             if src_aspect > target_aspect:
                 # Source is wider - crop left/right
                 new_width = int(src_height * target_aspect)
                 left = (src_width - new_width) // 2
-                self.current_image = self.current_image.crop((left, 0, left + new_width, src_height))
+                box = (left, 0, left + new_width, src_height)
             elif src_aspect < target_aspect:
                 # Source is taller - crop top/bottom
                 new_height = int(src_width / target_aspect)
                 top = (src_height - new_height) // 2
-                self.current_image = self.current_image.crop((0, top, src_width, top + new_height))
+                box = (0, top, src_width, top + new_height)
+            if box is not None:
+                self.current_image = self.current_image.crop(box)
             # Resize to target dimensions
             self.current_image = self.current_image.resize(
                 (target_width_pixels, target_height_pixels),
                 Image.Resampling.LANCZOS
             )
         else:  # keep_full_image
-            # Pad to match target aspect ratio, then resize
+            # Fit the whole image inside the target and pad the rest, centered
             # Background tint: 0% = white (255), 100% = black (0)
             bg_gray = int(255 * (1.0 - background_tint / 100.0))
-
-            # Create appropriate fill value based on image mode
-            mode = self.current_image.mode
-            if mode == 'L':
-                bg_value = bg_gray
-            elif mode == 'RGB':
-                bg_value = (bg_gray, bg_gray, bg_gray)
-            elif mode == 'RGBA':
-                bg_value = (bg_gray, bg_gray, bg_gray, 255)
-            else:
-                bg_value = bg_gray
-
-            if src_aspect > target_aspect:
-                # Source is wider - pad top/bottom
-                new_height = int(src_width / target_aspect)
-                pad_total = new_height - src_height
-                pad_top = pad_total // 2
-                # Create new image with padding
-                padded = Image.new(mode, (src_width, new_height), bg_value)
-                padded.paste(self.current_image, (0, pad_top))
-                self.current_image = padded
-            elif src_aspect < target_aspect:
-                # Source is taller - pad left/right
-                new_width = int(src_height * target_aspect)
-                pad_total = new_width - src_width
-                pad_left = pad_total // 2
-                # Create new image with padding
-                padded = Image.new(mode, (new_width, src_height), bg_value)
-                padded.paste(self.current_image, (pad_left, 0))
-                self.current_image = padded
-            # Resize to target dimensions
-            self.current_image = self.current_image.resize(
+            # Resizing before padding means neither the resampler nor the
+            # canvas fill ever touches the padding at source resolution
+            self.current_image = ImageOps.pad(
+                self.current_image,
                 (target_width_pixels, target_height_pixels),
-                Image.Resampling.LANCZOS
+                method=Image.Resampling.LANCZOS,
+                color=bg_gray
             )
 
-        # Convert to grayscale
-        self.current_image = ImageOps.grayscale(self.current_image)
-
-        # Invert if specified
-        if invert:
-            self.current_image = ImageOps.invert(self.current_image)
-
         # Apply blur if specified (convert mm to pixels)
+        # PIL's GaussianBlur is already separable (repeated 1-D box passes), so its
+        # cost per pixel does not grow with the radius
         if blur_mm > 0:
             blur_pixels = blur_mm * pixels_per_mm
             self.current_image = self.current_image.filter(ImageFilter.GaussianBlur(radius=blur_pixels))
 
-        # Apply border if specified
+        # Height map is an affine transform of the gray value:
+        # White (saturated, value=255) -> min_thickness
+        # Black (value=0) -> max_thickness
+        # The scale is negative because white should be thinner in a lithophane
+        thickness_range = max_thickness_mm - min_thickness_mm
+        scale = -thickness_range / 255.0
+        offset = max_thickness_mm
+
         border_width_mm = params.get("border_width_mm", 0.0)
         if border_width_mm > 0:
+            # The border is drawn in absolute gray levels, so invert first
+            img_array = np.asarray(self.current_image, dtype=np.float32)
+            if invert:
+                np.subtract(255.0, img_array, out=img_array)
+
             border_width_pixels = int(border_width_mm * pixels_per_mm)
             border_intensity = params.get("border_intensity", 50.0) / 100.0  # 0-1
             border_texture = params.get("border_texture", "solid")
-            self._apply_border(border_width_pixels, border_intensity, border_texture)
+            self._apply_border(img_array, border_width_pixels, border_intensity, border_texture)
 
-        # Convert image to numpy array (0-255)
-        img_array = np.array(self.current_image)
+            # Truncate to 8 bits like the preview, so it shows exactly what gets printed
+            np.floor(img_array, out=img_array)
+            self.current_image = Image.fromarray(img_array.astype(np.uint8), mode='L')
 
-        # Normalize to 0-1
-        normalized = img_array.astype(float) / 255.0
+            self.height_map = self._gray_to_height(img_array, scale, offset, out=img_array)
+        else:
+            # Fold inversion into the affine coefficients: 255 - v maps to
+            # min_thickness + v * range / 255
+            if invert:
+                scale, offset = -scale, min_thickness_mm
+            img_array = np.asarray(self.current_image, dtype=np.uint8)
+            self.height_map = self._gray_to_height(img_array, scale, offset)
+            # Invert the preview to match (a single 8-bit lookup)
+            if invert:
+                self.current_image = ImageOps.invert(self.current_image)
+
+    def _gray_to_height(self, gray: np.ndarray, scale: float, offset: float,
+                        out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Compute out = gray * scale + offset as float32.
 
-        # Create height map
-        # White (saturated, value=1.0) -> min_thickness
-        # Black (value=0.0) -> max_thickness
-        # We invert because white should be thinner in a lithophane
-        thickness_range = max_thickness_mm - min_thickness_mm
-        self.height_map = min_thickness_mm + ((1.0 - normalized) * thickness_range)
+        Works through blocks of rows small enough to stay in cache, so the
+        multiply and the add read each output value while it is still hot
+        instead of streaming the whole map through memory twice.
 
-    def _apply_border(self, width_pixels: int, intensity: float, texture: str):
+        Args:
+            gray: H×W gray values (uint8 or float32)
+            scale, offset: Affine coefficients
+            out: Optional float32 destination, may be gray itself
+        """
+        if out is None:
+            out = np.empty(gray.shape, dtype=np.float32)
+        rows_per_block = max(1, self.AFFINE_BLOCK_PIXELS // max(1, gray.shape[1]))
+        for y in range(0, gray.shape[0], rows_per_block):
+            block = out[y:y + rows_per_block]
+            np.multiply(gray[y:y + rows_per_block], scale, out=block, dtype=np.float32)
+            block += offset
+        return out
+
+    def _apply_border(self, img_array: np.ndarray, width_pixels: int, intensity: float,
+                      texture: str) -> np.ndarray:
         """
-        Apply a decorative border to the grayscale image.
+        Apply a decorative border in place to a grayscale image array.
 
         Args:
+            img_array: float32 H×W array of gray values (0-255), modified in place
             width_pixels: Border width in pixels
             intensity: Border darkness (0=white/thin, 1=black/thick)
             texture: Border texture type (solid, gradient, ribbed, dotted, wave, crosshatch)
+
+        Returns:
+            The same array, for convenience
         """
-        if width_pixels <= 0:
-            return
+        # Nothing to draw: skip building the distance map and mask
+        if width_pixels <= 0 or texture not in self.BORDER_TEXTURES:
+            return img_array
 
-        img_array = np.array(self.current_image, dtype=np.float32)
         h, w = img_array.shape
 
         # Base border gray value (0=black, 255=white)
         # intensity 0 = white (255), intensity 1 = black (0)
         base_gray = 255 * (1.0 - intensity)
 
+        dist = self._edge_distance(h, w)
+        mask = self._border_mask(h, w, width_pixels)
+
+        # Only the frame of the image is touched: top and bottom bands across the
+        # full width, then left and right bands between them (no overlap)
+        top_end = min(width_pixels, h)
+        bottom_start = max(h - width_pixels, top_end)
+        left_end = min(width_pixels, w)
+        right_start = max(w - width_pixels, left_end)
+        bands = [
+            (0, top_end, 0, w),
+            (bottom_start, h, 0, w),
+            (top_end, bottom_start, 0, left_end),
+            (top_end, bottom_start, right_start, w),
+        ]
+
+        for y0, y1, x0, x1 in bands:
+            if y1 <= y0 or x1 <= x0:
+                continue
+            self._apply_border_texture(
+                img_array[y0:y1, x0:x1], dist[y0:y1, x0:x1], mask[y0:y1, x0:x1], y0, x0,
+                h, w, width_pixels, base_gray, texture
+            )
+
+        return img_array
+
+    def _apply_border_texture(self, img_array: np.ndarray, dist: np.ndarray, mask: np.ndarray,
+                              y0: int, x0: int, h: int, w: int, width_pixels: int,
+                              base_gray: float, texture: str):
+        """
+        Apply a border texture in place to one region of the image.
+
+        Args:
+            img_array: float32 view of the region to modify
+            dist: Distance to the nearest image edge for each pixel of the region
+            mask: True for the pixels of the region that belong to the border
+            y0, x0: Position of the region's top-left pixel in the full image
+            h, w: Full image size
+            width_pixels: Border width in pixels
+            base_gray: Border gray value (0=black, 255=white)
+            texture: Border texture type
+        """
+        rows, cols = img_array.shape
+        ys = np.arange(y0, y0 + rows)[:, None]
+        xs = np.arange(x0, x0 + cols)[None, :]
+        # Pixels in the top/bottom bands run along X, the rest along Y
+        on_horizontal_edge = (ys < width_pixels) | (ys >= h - width_pixels)
+
         # Create border mask based on texture
         if texture == "solid":
             # Simple solid border
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        img_array[y, x] = base_gray
+            img_array[mask] = base_gray
 
         elif texture == "gradient":
             # Gradient that fades from border intensity to image
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        # Fade factor: 0 at edge, 1 at inner border edge
-                        fade = dist / width_pixels
-                        img_array[y, x] = base_gray * (1 - fade) + img_array[y, x] * fade
+            # Fade factor: 0 at edge, 1 at inner border edge
+            fade = dist[mask].astype(np.float32) / width_pixels
+            img_array[mask] = base_gray * (1 - fade) + img_array[mask] * fade
 
         elif texture == "ribbed":
             # Vertical ribbed pattern
             rib_spacing = max(3, width_pixels // 4)
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        # Create ribs based on position along border
-                        if y < width_pixels or y >= h - width_pixels:
-                            rib_pos = x % rib_spacing
-                        else:
-                            rib_pos = y % rib_spacing
-                        rib_factor = 0.5 + 0.5 * math.sin(rib_pos / rib_spacing * math.pi * 2)
-                        gray = base_gray * (0.7 + 0.3 * rib_factor)
-                        img_array[y, x] = gray
+            # Create ribs based on position along border
+            rib_pos = np.where(on_horizontal_edge, xs % rib_spacing, ys % rib_spacing)
+            rib_factor = 0.5 + 0.5 * np.sin(rib_pos / rib_spacing * np.pi * 2)
+            gray = base_gray * (0.7 + 0.3 * rib_factor)
+            img_array[mask] = gray[mask]
 
         elif texture == "dotted":
             # Perforated dot pattern
             dot_spacing = max(4, width_pixels // 3)
             dot_radius = max(1, dot_spacing // 3)
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        # Check if we're in a dot
-                        dx = x % dot_spacing - dot_spacing // 2
-                        dy = y % dot_spacing - dot_spacing // 2
-                        in_dot = (dx * dx + dy * dy) < (dot_radius * dot_radius)
-                        if in_dot:
-                            img_array[y, x] = 255  # White (thin) for dots
-                        else:
-                            img_array[y, x] = base_gray
+            # Check if we're in a dot
+            dx = xs % dot_spacing - dot_spacing // 2
+            dy = ys % dot_spacing - dot_spacing // 2
+            in_dot = (dx * dx + dy * dy) < (dot_radius * dot_radius)
+            img_array[mask & in_dot] = 255  # White (thin) for dots
+            img_array[mask & ~in_dot] = base_gray
 
         elif texture == "wave":
             # Sine wave pattern along border
-            wave_freq = 2 * math.pi / max(10, width_pixels * 2)
+            wave_freq = 2 * np.pi / max(10, width_pixels * 2)
             wave_amp = width_pixels * 0.3
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        # Determine which edge we're on and position along it
-                        if y < width_pixels:
-                            pos = x
-                        elif y >= h - width_pixels:
-                            pos = x
-                        elif x < width_pixels:
-                            pos = y
-                        else:
-                            pos = y
-                        wave = math.sin(pos * wave_freq) * wave_amp
-                        effective_dist = dist + wave
-                        if effective_dist < width_pixels * 0.7:
-                            img_array[y, x] = base_gray
-                        elif effective_dist < width_pixels:
-                            fade = (effective_dist - width_pixels * 0.7) / (width_pixels * 0.3)
-                            img_array[y, x] = base_gray * (1 - fade) + img_array[y, x] * fade
+            # Position along the edge we're on
+            pos = np.where(on_horizontal_edge, xs, ys)
+            wave = np.sin(pos * wave_freq) * wave_amp
+            effective_dist = dist + wave
+            solid = mask & (effective_dist < width_pixels * 0.7)
+            faded = mask & ~solid & (effective_dist < width_pixels)
+            img_array[solid] = base_gray
+            fade = (effective_dist[faded] - width_pixels * 0.7) / (width_pixels * 0.3)
+            img_array[faded] = base_gray * (1 - fade) + img_array[faded] * fade
 
         elif texture == "crosshatch":
             # Crosshatch diagonal pattern
             line_spacing = max(3, width_pixels // 3)
-            for y in range(h):
-                for x in range(w):
-                    dist = min(x, y, w - 1 - x, h - 1 - y)
-                    if dist < width_pixels:
-                        # Diagonal lines in both directions
-                        diag1 = (x + y) % line_spacing < 2
-                        diag2 = (x - y) % line_spacing < 2
-                        if diag1 or diag2:
-                            img_array[y, x] = base_gray * 0.7
-                        else:
-                            img_array[y, x] = base_gray
-
-        # Convert back to PIL Image
-        self.current_image = Image.fromarray(img_array.astype(np.uint8), mode='L')
+            # Diagonal lines in both directions
+            diag1 = (xs + ys) % line_spacing < 2
+            diag2 = (xs - ys) % line_spacing < 2
+            hatch = np.where(diag1 | diag2, base_gray * 0.7, base_gray)
+            img_array[mask] = hatch[mask]
+
+    def _edge_distance(self, h: int, w: int) -> np.ndarray:
+        """
+        Get the distance (in pixels) from every pixel to the nearest image edge.
+
+        The map only depends on the image size, so it is cached and shared by
+        all border textures across repeated renders. Distances fit in int16 for
+        any practical image, halving the map's footprint.
+        """
+        key = (h, w)
+        dist = self._dist_cache.get(key)
+        if dist is None:
+            # The image size changed, drop maps for the previous size
+            self._dist_cache.clear()
+            self._mask_cache.clear()
+            dtype = np.int16 if max(h, w) <= np.iinfo(np.int16).max else np.int32
+            ys = np.arange(h, dtype=dtype)[:, None]
+            xs = np.arange(w, dtype=dtype)[None, :]
+            dist = np.minimum(np.minimum(xs, w - 1 - xs), np.minimum(ys, h - 1 - ys))
+            dist.setflags(write=False)  # Shared between calls, must not be modified
+            self._dist_cache[key] = dist
+        return dist
+
+    def _border_mask(self, h: int, w: int, width_pixels: int) -> np.ndarray:
+        """Get the cached boolean mask of pixels closer than width_pixels to an edge"""
+        key = (h, w, width_pixels)
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            dist = self._edge_distance(h, w)
+            self._mask_cache.clear()  # Only keep the mask for the latest border width
+            mask = dist < width_pixels
+            mask.setflags(write=False)
+            self._mask_cache[key] = mask
+        return mask
 
     def get_current_image(self) -> Optional[Image.Image]:
         """Get the current processed image"""
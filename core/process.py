@@ -1,10 +1,30 @@
 """
 Process model for managing image processing operations
 """
-import json
 from typing import List, Dict, Any
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # Optional, falls back to the standard library json module
+    orjson = None
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Serialize data to indented JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    import json
+    return json.dumps(data, indent=2).encode()
+
+
+def _loads(raw: bytes) -> Dict[str, Any]:
+    """Parse JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    import json
+    return json.loads(raw)
+
 
 class Operation:
     """Base class for image processing operations"""
@@ -68,14 +88,12 @@ class Process:
 
     def save(self, filepath: Path):
         """Save process to JSON file"""
-        with open(filepath, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        Path(filepath).write_bytes(_dumps(self.to_dict()))
 
     @classmethod
     def load(cls, filepath: Path) -> 'Process':
         """Load process from JSON file"""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        data = _loads(Path(filepath).read_bytes())
         return cls.from_dict(data)
 
     def __repr__(self):
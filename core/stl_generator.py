@@ -1,8 +1,12 @@
 """
 STL file generator from height maps
 """
+import math
+
 import numpy as np
+import stl
 from stl import mesh
+from typing import Dict, Optional, Tuple
 
 
 class STLGenerator:
@@ -10,6 +14,7 @@ class STLGenerator:
 
     def __init__(self):
         self.mesh = None
+        self._grid_faces_cache: Dict[Tuple[int, int], np.ndarray] = {}  # Top-surface faces by (rows, cols)
 
     def generate_from_heightmap(self, height_map: np.ndarray, pixel_size_mm: float = 0.1, angle: float = 75.0) -> mesh.Mesh:
         """
@@ -25,17 +30,15 @@ class STLGenerator:
         """
         rows, cols = height_map.shape
 
-        # Create vertices for the top surface
+        # Create vertices for the top surface, one per pixel in row-major order
         # Note: Flip Y so image top (row 0) maps to high Y, making the STL right-side-up
-        vertices_top = []
-        for i in range(rows):
-            for j in range(cols):
-                x = j * pixel_size_mm
-                y = (rows - 1 - i) * pixel_size_mm
-                z = height_map[i, j]
-                vertices_top.append([x, y, z])
-
-        vertices_top = np.array(vertices_top)
+        # Stored as float32, the precision numpy-stl keeps, so the final gather
+        # into the mesh is a plain copy
+        vertices_top = np.empty((rows * cols, 3), dtype=np.float32)
+        grid = vertices_top.reshape(rows, cols, 3)
+        grid[:, :, 0] = np.arange(cols) * pixel_size_mm
+        grid[:, :, 1] = ((rows - 1 - np.arange(rows)) * pixel_size_mm)[:, None]
+        grid[:, :, 2] = height_map
 
         # Choose mesh strategy based on angle
         # angle=0: simplified bottom (4 corners) - saves ~50% triangles
@@ -43,23 +46,30 @@ class STLGenerator:
         use_simplified_bottom = (angle == 0)
 
         if use_simplified_bottom:
-            stl_mesh = self._create_simplified_mesh(vertices_top, rows, cols, pixel_size_mm)
+            vertices, faces = self._create_simplified_mesh(vertices_top, rows, cols, pixel_size_mm)
         else:
-            stl_mesh = self._create_grid_mesh(vertices_top, rows, cols, pixel_size_mm)
+            vertices, faces = self._create_grid_mesh(vertices_top, rows, cols, pixel_size_mm)
 
-        # Apply rotation around X-axis if angle is not 0
+        # Apply rotation around X-axis if angle is not 0. Rotating, clamping and
+        # rounding act on each vertex alone, so they run on the shared vertex
+        # buffer before it is expanded into triangles (about 6x fewer points)
         if angle != 0 and angle != 90:
-            stl_mesh = self._apply_angled_rotation(stl_mesh, angle, pixel_size_mm)
+            stl_mesh = self._apply_angled_rotation(vertices, faces, angle, pixel_size_mm, height_map)
         elif angle == 90:
-            stl_mesh = self._apply_vertical_rotation(stl_mesh)
-
-        # For angle == 0, no rotation needed, mesh already has flat bottom
+            stl_mesh = self._apply_vertical_rotation(vertices, faces)
+        else:
+            # For angle == 0, no rotation needed, mesh already has flat bottom
+            stl_mesh = self._build_mesh(vertices, faces)
 
         self.mesh = stl_mesh
         return stl_mesh
 
-    def _create_simplified_mesh(self, vertices_top: np.ndarray, rows: int, cols: int, pixel_size_mm: float) -> mesh.Mesh:
-        """Create mesh with simplified bottom (4 corners, 2 triangles) for angle=0"""
+    def _create_simplified_mesh(self, vertices_top: np.ndarray, rows: int, cols: int,
+                                pixel_size_mm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Create mesh with simplified bottom (4 corners, 2 triangles) for angle=0
+
+        Returns the vertex buffer and the (N, 3) face index array.
+        """
         max_x = (cols - 1) * pixel_size_mm
         max_y = (rows - 1) * pixel_size_mm
         vertices_bottom = np.array([
@@ -67,63 +77,36 @@ class STLGenerator:
             [max_x, max_y, 0],  # TR - top-right (high Y, high X)
             [0, 0, 0],          # BL - bottom-left (low Y, low X)
             [max_x, 0, 0],      # BR - bottom-right (low Y, high X)
-        ])
-
-        faces = []
-
-        # Top surface faces (full detail needed)
-        for i in range(rows - 1):
-            for j in range(cols - 1):
-                idx = i * cols + j
-                faces.append([idx, idx + cols, idx + 1])
-                faces.append([idx + 1, idx + cols, idx + cols + 1])
+        ], dtype=np.float32)
 
         # Bottom corner indices
         offset = rows * cols
-        TL, TR, BL, BR = offset, offset + 1, offset + 2, offset + 3
-
-        # Bottom surface - just 2 triangles
-        faces.append([BL, TL, BR])
-        faces.append([TL, TR, BR])
-
-        # Side faces as triangle fans from bottom corners to top edge vertices
-        # Left wall: fan from BL
-        for i in range(rows - 1):
-            top_curr = (rows - 1 - i) * cols
-            top_next = (rows - 2 - i) * cols
-            faces.append([BL, top_curr, top_next])
-        faces.append([BL, 0, TL])
-
-        # Right wall: fan from BR
-        faces.append([BR, TR, cols - 1])
-        for i in range(rows - 1):
-            top_curr = i * cols + (cols - 1)
-            top_next = (i + 1) * cols + (cols - 1)
-            faces.append([BR, top_curr, top_next])
-
-        # Front wall: fan from TL
-        for j in range(cols - 1):
-            faces.append([TL, j, j + 1])
-        faces.append([TL, cols - 1, TR])
-
-        # Back wall: fan from BR
-        for j in range(cols - 1):
-            top_curr = (rows - 1) * cols + (cols - 1 - j)
-            top_next = (rows - 1) * cols + (cols - 2 - j)
-            faces.append([BR, top_curr, top_next])
-        faces.append([BR, (rows - 1) * cols, BL])
-
-        faces = np.array(faces)
-        all_vertices = np.vstack([vertices_top, vertices_bottom])
-
-        stl_mesh = mesh.Mesh(np.zeros(faces.shape[0], dtype=mesh.Mesh.dtype))
-        for i, face in enumerate(faces):
-            for j in range(3):
-                stl_mesh.vectors[i][j] = all_vertices[face[j]]
+        TL, TR, BL, BR = offset + np.arange(4, dtype=np.int32)
+        top_row = np.arange(cols, dtype=np.int32)
+        bottom_row = (rows - 1) * cols + top_row
+        left_col = np.arange(rows, dtype=np.int32) * cols
+        right_col = left_col + (cols - 1)
+
+        faces = np.concatenate([
+            # Top surface faces (full detail needed)
+            self._grid_faces(rows, cols),
+            # Bottom surface - just 2 triangles
+            np.array([[BL, TL, BR], [TL, TR, BR]], dtype=np.int32),
+            # Side faces as triangle fans from bottom corners to top edge vertices
+            # Left wall: fan from BL
+            self._fan_faces(BL, np.append(left_col[::-1], TL)),
+            # Right wall: fan from BR
+            self._fan_faces(BR, np.concatenate([[TR], right_col])),
+            # Front wall: fan from TL
+            self._fan_faces(TL, np.append(top_row, TR)),
+            # Back wall: fan from BR
+            self._fan_faces(BR, np.append(bottom_row[::-1], BL)),
+        ])
 
-        return stl_mesh
+        return np.vstack([vertices_top, vertices_bottom]), faces
 
-    def _create_grid_mesh(self, vertices_top: np.ndarray, rows: int, cols: int, pixel_size_mm: float) -> mesh.Mesh:
+    def _create_grid_mesh(self, vertices_top: np.ndarray, rows: int, cols: int,
+                          pixel_size_mm: float) -> Tuple[np.ndarray, np.ndarray]:
         """Create mesh with simplified back face using perimeter fan triangulation.
 
         Uses perimeter fan for back face:
@@ -131,165 +114,138 @@ class STLGenerator:
         - Perimeter fan: 2*(rows-1) + 2*(cols-1) ≈ 800 triangles for 200x200
 
         The _merge_z0_vertices() function handles vertex alignment after rotation.
+        Returns the vertex buffer and the (N, 3) face index array.
         """
         max_x = (cols - 1) * pixel_size_mm
         max_y = (rows - 1) * pixel_size_mm
 
-        # Bottom perimeter vertices only (not full grid)
-        vertices_bottom = []
-        bottom_idx_map = {}  # maps (i,j) to vertex index in vertices_bottom
-
-        # Front edge (i=0)
-        for j in range(cols):
-            x = j * pixel_size_mm
-            y = max_y
-            bottom_idx_map[(0, j)] = len(vertices_bottom)
-            vertices_bottom.append([x, y, 0])
-
-        # Back edge (i=rows-1)
-        for j in range(cols):
-            x = j * pixel_size_mm
-            y = 0
-            bottom_idx_map[(rows - 1, j)] = len(vertices_bottom)
-            vertices_bottom.append([x, y, 0])
-
-        # Left edge (j=0), excluding corners already added
-        for i in range(1, rows - 1):
-            x = 0
-            y = (rows - 1 - i) * pixel_size_mm
-            bottom_idx_map[(i, 0)] = len(vertices_bottom)
-            vertices_bottom.append([x, y, 0])
-
-        # Right edge (j=cols-1), excluding corners already added
-        for i in range(1, rows - 1):
-            x = max_x
-            y = (rows - 1 - i) * pixel_size_mm
-            bottom_idx_map[(i, cols - 1)] = len(vertices_bottom)
-            vertices_bottom.append([x, y, 0])
-
-        # Add center vertex for fan triangulation
-        center_idx = len(vertices_bottom)
-        vertices_bottom.append([max_x / 2, max_y / 2, 0])
-
-        vertices_bottom = np.array(vertices_bottom)
+        # Bottom perimeter vertices only (not full grid): front edge (i=0),
+        # back edge (i=rows-1), then the left (j=0) and right (j=cols-1) edges
+        # without the corners, then a center vertex for fan triangulation. A
+        # single-row map has no side vertices; its front and back edges coincide
+        sides = max(rows - 2, 0)
+        edge_x = np.arange(cols) * pixel_size_mm
+        side_y = (rows - 2 - np.arange(sides)) * pixel_size_mm
+        vertices_bottom = np.zeros((2 * cols + 2 * sides + 1, 3), dtype=np.float32)
+        vertices_bottom[:cols, 0] = edge_x
+        vertices_bottom[:cols, 1] = max_y
+        vertices_bottom[cols:2 * cols, 0] = edge_x
+        vertices_bottom[2 * cols:2 * cols + sides, 1] = side_y
+        vertices_bottom[2 * cols + sides:-1, 0] = max_x
+        vertices_bottom[2 * cols + sides:-1, 1] = side_y
+        vertices_bottom[-1, :2] = (max_x / 2, max_y / 2)
+
+        # Indices of the bottom perimeter vertex under each top edge vertex
         offset = rows * cols  # bottom vertices start after top vertices
+        front_bottom = offset + np.arange(cols, dtype=np.int32)
+        back_bottom = front_bottom + cols
+        left_bottom = np.empty(rows, dtype=np.int32)
+        left_bottom[1:-1] = offset + 2 * cols + np.arange(sides, dtype=np.int32)
+        left_bottom[0], left_bottom[-1] = front_bottom[0], back_bottom[0]
+        right_bottom = np.empty(rows, dtype=np.int32)
+        right_bottom[1:-1] = left_bottom[1:-1] + sides
+        right_bottom[0], right_bottom[-1] = front_bottom[-1], back_bottom[-1]
+        center = offset + len(vertices_bottom) - 1
+
+        # Top edge vertex indices
+        front_top = np.arange(cols, dtype=np.int32)
+        back_top = (rows - 1) * cols + front_top
+        left_top = np.arange(rows, dtype=np.int32) * cols
+        right_top = left_top + (cols - 1)
+
+        # Bottom surface perimeter loop: front, right, back (reversed), left (reversed)
+        perimeter = np.concatenate([front_bottom, right_bottom[1:], back_bottom[-2::-1],
+                                    left_bottom[-2::-1]])
+
+        faces = np.concatenate([
+            # Top surface faces (full detail needed)
+            self._grid_faces(rows, cols),
+            # Bottom surface - fan from center to perimeter, wound to face down
+            self._fan_faces(center, perimeter)[:, [0, 2, 1]],
+            # Side faces - connecting top edge to bottom perimeter; the left and
+            # back walls swap two corners so every wall faces outward
+            self._wall_faces(left_top, left_bottom)[:, [0, 2, 1]],
+            self._wall_faces(right_top, right_bottom),
+            self._wall_faces(front_top, front_bottom),
+            self._wall_faces(back_top, back_bottom)[:, [0, 2, 1]],
+        ])
 
-        faces = []
-
-        # Top surface faces (full detail needed)
-        for i in range(rows - 1):
-            for j in range(cols - 1):
-                idx = i * cols + j
-                faces.append([idx, idx + cols, idx + 1])
-                faces.append([idx + 1, idx + cols, idx + cols + 1])
-
-        # Bottom surface - fan from center to perimeter
-        center = offset + center_idx
-
-        # Front edge (high Y)
-        for j in range(cols - 1):
-            v1 = offset + bottom_idx_map[(0, j)]
-            v2 = offset + bottom_idx_map[(0, j + 1)]
-            faces.append([center, v2, v1])
-
-        # Right edge
-        for i in range(rows - 1):
-            v1 = offset + bottom_idx_map[(i, cols - 1)]
-            v2 = offset + bottom_idx_map[(i + 1, cols - 1)]
-            faces.append([center, v2, v1])
-
-        # Back edge (low Y)
-        for j in range(cols - 1, 0, -1):
-            v1 = offset + bottom_idx_map[(rows - 1, j)]
-            v2 = offset + bottom_idx_map[(rows - 1, j - 1)]
-            faces.append([center, v2, v1])
-
-        # Left edge
-        for i in range(rows - 1, 0, -1):
-            v1 = offset + bottom_idx_map[(i, 0)]
-            v2 = offset + bottom_idx_map[(i - 1, 0)]
-            faces.append([center, v2, v1])
-
-        # Side faces - connecting top edge to bottom perimeter
-        # Left edge (j=0)
-        for i in range(rows - 1):
-            top1 = i * cols
-            top2 = (i + 1) * cols
-            bot1 = offset + bottom_idx_map[(i, 0)]
-            bot2 = offset + bottom_idx_map[(i + 1, 0)]
-            faces.append([top1, bot1, top2])
-            faces.append([top2, bot1, bot2])
-
-        # Right edge (j=cols-1)
-        for i in range(rows - 1):
-            top1 = i * cols + (cols - 1)
-            top2 = (i + 1) * cols + (cols - 1)
-            bot1 = offset + bottom_idx_map[(i, cols - 1)]
-            bot2 = offset + bottom_idx_map[(i + 1, cols - 1)]
-            faces.append([top1, top2, bot1])
-            faces.append([top2, bot2, bot1])
-
-        # Front edge (i=0)
-        for j in range(cols - 1):
-            top1 = j
-            top2 = j + 1
-            bot1 = offset + bottom_idx_map[(0, j)]
-            bot2 = offset + bottom_idx_map[(0, j + 1)]
-            faces.append([top1, top2, bot1])
-            faces.append([top2, bot2, bot1])
-
-        # Back edge (i=rows-1)
-        for j in range(cols - 1):
-            top1 = (rows - 1) * cols + j
-            top2 = (rows - 1) * cols + j + 1
-            bot1 = offset + bottom_idx_map[(rows - 1, j)]
-            bot2 = offset + bottom_idx_map[(rows - 1, j + 1)]
-            faces.append([top1, bot1, top2])
-            faces.append([top2, bot1, bot2])
-
-        faces = np.array(faces)
-        all_vertices = np.vstack([vertices_top, vertices_bottom])
+        return np.vstack([vertices_top, vertices_bottom]), faces
 
+    def _build_mesh(self, vertices: np.ndarray, faces: np.ndarray) -> mesh.Mesh:
+        """Expand a vertex buffer and face indices into a numpy-stl mesh"""
         stl_mesh = mesh.Mesh(np.zeros(faces.shape[0], dtype=mesh.Mesh.dtype))
-        for i, face in enumerate(faces):
-            for j in range(3):
-                stl_mesh.vectors[i][j] = all_vertices[face[j]]
-
+        stl_mesh.vectors[:] = vertices[faces]
         return stl_mesh
 
-    def _apply_angled_rotation(self, stl_mesh: mesh.Mesh, angle: float, pixel_size_mm: float) -> mesh.Mesh:
-        """Apply rotation and clamping for angled builds (0 < angle < 90)"""
+    def _grid_faces(self, rows: int, cols: int) -> np.ndarray:
+        """
+        Two triangles per cell of the rows x cols top-surface vertex grid.
+
+        The topology only depends on the grid size, so it is cached and reused
+        when the same image is regenerated with different settings.
+        """
+        key = (rows, cols)
+        faces = self._grid_faces_cache.get(key)
+        if faces is None:
+            # Only keep the faces for the latest grid size
+            self._grid_faces_cache.clear()
+            idx = (np.arange(rows - 1)[:, None] * cols + np.arange(cols - 1)[None, :]).ravel()
+            faces = np.empty((2 * idx.size, 3), dtype=np.int32)
+            faces[0::2] = np.stack([idx, idx + cols, idx + 1], axis=1)
+            faces[1::2] = np.stack([idx + 1, idx + cols, idx + cols + 1], axis=1)
+            faces.setflags(write=False)
+            self._grid_faces_cache[key] = faces
+        return faces
+
+    def _fan_faces(self, apex: int, rim: np.ndarray) -> np.ndarray:
+        """Triangle fan from apex over consecutive pairs of rim vertices"""
+        return np.stack([np.full(len(rim) - 1, apex, dtype=np.int32), rim[:-1], rim[1:]], axis=1)
+
+    def _wall_faces(self, top: np.ndarray, bottom: np.ndarray) -> np.ndarray:
+        """Strip of two triangles per segment joining a top edge to the bottom edge below it"""
+        faces = np.empty((2 * (len(top) - 1), 3), dtype=np.int32)
+        faces[0::2] = np.stack([top[:-1], top[1:], bottom[:-1]], axis=1)
+        faces[1::2] = np.stack([top[1:], bottom[1:], bottom[:-1]], axis=1)
+        return faces
+
+    def _apply_angled_rotation(self, vertices: np.ndarray, faces: np.ndarray, angle: float,
+                               pixel_size_mm: float, height_map: Optional[np.ndarray] = None) -> mesh.Mesh:
+        """Apply rotation and clamping for angled builds (0 < angle < 90)
+
+        The vertex buffer is transformed in place and then expanded into the
+        mesh. When the height map the vertices were built from is given, the
+        rotated Z range is derived from it instead of scanning the vertices.
+        """
         # Avoid exactly 45° which causes numeric precision issues
         # (sin(45°) = cos(45°) creates vertex coincidences)
         if abs(angle - 45.0) < 0.1:
             angle = 45.1
 
         # Record original Y span - this is the target height when laid flat
-        original_height = stl_mesh.vectors[:, :, 1].max() - stl_mesh.vectors[:, :, 1].min()
-
-        angle_rad = np.radians(angle)
-        cos_a = np.cos(angle_rad)
-        sin_a = np.sin(angle_rad)
-
-        # Rotation matrix around X-axis
-        for i in range(len(stl_mesh.vectors)):
-            for j in range(3):
-                y = stl_mesh.vectors[i][j][1]
-                z = stl_mesh.vectors[i][j][2]
-                stl_mesh.vectors[i][j][1] = y * cos_a - z * sin_a
-                stl_mesh.vectors[i][j][2] = y * sin_a + z * cos_a
-
-        # Create a flat bottom
-        min_z = stl_mesh.vectors[:, :, 2].min()
-        max_z = stl_mesh.vectors[:, :, 2].max()
+        original_height = vertices[:, 1].max() - vertices[:, 1].min()
+
+        angle_rad = math.radians(angle)
+        rotation = self._rotation_matrix_x(angle_rad)
+        cos_a, sin_a = rotation[1, 1], rotation[2, 1]
+
+        # Rotation around X-axis; the rotated Y/Z columns are kept as local
+        # arrays through shifting, clamping and rounding and written back once
+        y, z = self._rotated_yz(vertices, rotation)
+
+        # Create a flat bottom; the analytic range only holds for 0 < angle < 90
+        if height_map is not None and sin_a > 0 and cos_a > 0 and height_map.min() >= 0:
+            min_z, max_z = self._rotated_z_range(height_map, pixel_size_mm, cos_a, sin_a)
+        else:
+            min_z, max_z = z.min(), z.max()
         model_height = max_z - min_z
 
         # Calculate how much to lower for good flat bottom contact
         target_flat_width = 2.0  # mm
-        flat_depth = max(target_flat_width * np.sin(angle_rad), model_height * 0.01)
+        flat_depth = max(target_flat_width * sin_a, model_height * 0.01)
 
         # Move mesh so that min_z + flat_depth = 0
-        stl_mesh.vectors[:, :, 2] -= (min_z + flat_depth)
+        z -= (min_z + flat_depth)
 
         # Clamp vertices below z=0 to z=0, compensating y for the rotation angle
         # When clamping z, we need to slide along the tilted plane direction,
@@ -297,20 +253,22 @@ class STLGenerator:
         # For a vertex at z < 0, project onto z=0 along the rotated plane:
         #   y_new = y_old - z_old * cot(angle) = y_old - z_old * cos/sin
         cot_a = cos_a / sin_a
-        below_zero = stl_mesh.vectors[:, :, 2] < 0
+        below_zero = z < 0
         # Adjust y based on how far below z=0 the vertex is
-        stl_mesh.vectors[:, :, 1] = np.where(
-            below_zero,
-            stl_mesh.vectors[:, :, 1] - stl_mesh.vectors[:, :, 2] * cot_a,
-            stl_mesh.vectors[:, :, 1]
-        )
+        y[below_zero] -= z[below_zero] * cot_a
         # Then clamp z to 0
-        stl_mesh.vectors[:, :, 2] = np.maximum(stl_mesh.vectors[:, :, 2], 0.0)
+        np.maximum(z, 0.0, out=z)
 
         # Round vertex positions to avoid floating-point precision issues
         # that create non-manifold edges (especially at angles like 45°)
         precision = 1e-6
-        stl_mesh.vectors = np.round(stl_mesh.vectors / precision) * precision
+        for column in (vertices[:, 0], y, z):
+            np.divide(column, precision, out=column)
+            np.rint(column, out=column)
+            np.multiply(column, precision, out=column)
+        vertices[:, 1] = y
+        vertices[:, 2] = z
+        stl_mesh = self._build_mesh(vertices, faces)
 
         # Merge vertices that are very close together at z=0.
         # After Y-compensation, vertices at the same grid position but different
@@ -332,12 +290,13 @@ class STLGenerator:
         # 2. The tilted front face extending the bounding box
         # Empirically: overhang ≈ flat_depth / sin(angle) + thickness * cos(angle) / sin(angle)
         # Simplified: we compute the actual bounding box expansion and compensate.
-        current_z_max = stl_mesh.vectors[:, :, 2].max()
-        current_y_extent = stl_mesh.vectors[:, :, 1].max() - stl_mesh.vectors[:, :, 1].min()
+        # One min and one max pass over all three columns at once
+        lower = stl_mesh.vectors.min(axis=(0, 1))
+        current_z_max = stl_mesh.vectors.max(axis=(0, 1))[2]
         if current_z_max > 0:
             # The laid-flat Y extent includes standing Z plus Y contribution from angle
             # Y_flat ≈ Z_standing + |Y_min_standing| where Y_min comes from clamping offset
-            y_min_abs = abs(stl_mesh.vectors[:, :, 1].min())
+            y_min_abs = abs(lower[1])
             estimated_flat_y = current_z_max + y_min_abs
             target_z = original_height * (current_z_max / estimated_flat_y)
             scale_factor = target_z / current_z_max
@@ -345,50 +304,97 @@ class STLGenerator:
 
         return stl_mesh
 
-    def _apply_vertical_rotation(self, stl_mesh: mesh.Mesh) -> mesh.Mesh:
+    def _apply_vertical_rotation(self, vertices: np.ndarray, faces: np.ndarray) -> mesh.Mesh:
         """Apply 90 degree rotation for vertical builds"""
-        angle_rad = np.radians(90)
-        cos_a = np.cos(angle_rad)
-        sin_a = np.sin(angle_rad)
-
-        for i in range(len(stl_mesh.vectors)):
-            for j in range(3):
-                y = stl_mesh.vectors[i][j][1]
-                z = stl_mesh.vectors[i][j][2]
-                stl_mesh.vectors[i][j][1] = y * cos_a - z * sin_a
-                stl_mesh.vectors[i][j][2] = y * sin_a + z * cos_a
+        # A quarter turn around X maps (y, z) to (-z, y): a swap and a negation,
+        # exact and without any multiplications
+        y = vertices[:, 1].copy()
+        vertices[:, 1] = -vertices[:, 2]
+        vertices[:, 2] = y
 
         # Translate so bottom sits on build plate
-        min_z = stl_mesh.vectors[:, :, 2].min()
-        stl_mesh.vectors[:, :, 2] -= min_z
+        vertices[:, 2] -= vertices[:, 2].min()
 
-        return stl_mesh
+        return self._build_mesh(vertices, faces)
 
-    def _remove_duplicate_faces(self, stl_mesh: mesh.Mesh) -> mesh.Mesh:
-        """Remove duplicate faces that have the same vertices (regardless of order)"""
-        seen_faces = set()
-        valid_indices = []
+    def _rotated_z_range(self, height_map: np.ndarray, pixel_size_mm: float,
+                         cos_a: float, sin_a: float) -> Tuple[np.float32, np.float32]:
+        """
+        Z range of the mesh after rotating it around the X-axis.
 
-        for i, triangle in enumerate(stl_mesh.vectors):
-            # Create a canonical representation of the face
-            # Sort vertices to create order-independent key
-            verts = [tuple(np.round(v, 6)) for v in triangle]
-            face_key = tuple(sorted(verts))
+        Every vertex has y >= 0 and z >= 0, so the bottom vertex at y=0 stays
+        lowest at z=0, and the highest is the tallest top-surface vertex of
+        some row. Only one value per row is rotated, with the same float32
+        rounding as the mesh, so the result matches a scan of the mesh.
+        """
+        rows = height_map.shape[0]
+        row_y = ((rows - 1 - np.arange(rows)) * pixel_size_mm).astype(np.float32)
+        row_max = height_map.max(axis=1).astype(np.float32)
+        row_z = (row_y * sin_a + row_max * cos_a).astype(np.float32)
+        return np.float32(0.0), row_z.max()
+
+    def _rotation_matrix_x(self, angle_rad: float) -> np.ndarray:
+        """3x3 matrix rotating column vectors around the X-axis"""
+        cos_a = math.cos(angle_rad)
+        sin_a = math.sin(angle_rad)
+        return np.array([
+            [1.0, 0.0, 0.0],
+            [0.0, cos_a, -sin_a],
+            [0.0, sin_a, cos_a],
+        ])
 
-            if face_key not in seen_faces:
-                seen_faces.add(face_key)
-                valid_indices.append(i)
+    def _rotated_yz(self, points: np.ndarray, rotation: np.ndarray):
+        """Return the Y and Z columns of (..., 3) points after an X-axis rotation, as float32 arrays"""
+        # X is unchanged, so only the Y/Z block of the matrix is applied. This is
+        # done elementwise: the columns are strided views, and a matmul over
+        # them is several times slower than two multiply-adds
+        (yy, yz), (zy, zz) = rotation[1:, 1:]
+        y = points[..., 1]
+        z = points[..., 2]
+        return (y * yy + z * yz).astype(np.float32), (y * zy + z * zz).astype(np.float32)
 
-        if len(valid_indices) == len(stl_mesh.vectors):
+    def _remove_duplicate_faces(self, stl_mesh: mesh.Mesh) -> mesh.Mesh:
+        """Remove duplicate faces that have the same vertices (regardless of order)"""
+        n_faces = len(stl_mesh.vectors)
+        if n_faces == 0:
+            return stl_mesh
+
+        # Label each distinct vertex (to 1e-6 mm) with an integer id. The
+        # quantized coordinates are sorted as plain integer columns, which is
+        # much faster than np.unique(axis=0) on whole rows
+        quantized = np.rint(stl_mesh.vectors.reshape(-1, 3).astype(np.float64) * 1e6).astype(np.int64)
+        vertex_ids = self._row_group_ids(quantized)
+
+        # Sort the ids within each face to get an order-independent key,
+        # then keep the first face for each key
+        face_keys = np.sort(vertex_ids.reshape(n_faces, 3), axis=1)
+        order = np.lexsort(face_keys.T[::-1])
+        sorted_keys = face_keys[order]
+        is_first = np.ones(n_faces, dtype=bool)
+        is_first[1:] = (sorted_keys[1:] != sorted_keys[:-1]).any(axis=1)
+        # lexsort is stable, so the first of each run is the earliest face
+        first = order[is_first]
+
+        if len(first) == n_faces:
             return stl_mesh  # No duplicates
 
         # Create new mesh without duplicates
+        valid_indices = np.sort(first)
         new_mesh = mesh.Mesh(np.zeros(len(valid_indices), dtype=mesh.Mesh.dtype))
-        for new_idx, old_idx in enumerate(valid_indices):
-            new_mesh.vectors[new_idx] = stl_mesh.vectors[old_idx]
+        new_mesh.vectors[:] = stl_mesh.vectors[valid_indices]
 
         return new_mesh
 
+    def _row_group_ids(self, rows: np.ndarray) -> np.ndarray:
+        """Give equal rows of an integer (N, K) array the same id, numbered in sorted order"""
+        order = np.lexsort(rows.T[::-1])
+        sorted_rows = rows[order]
+        is_new = np.ones(len(rows), dtype=bool)
+        is_new[1:] = (sorted_rows[1:] != sorted_rows[:-1]).any(axis=1)
+        ids = np.empty(len(rows), dtype=np.int64)
+        ids[order] = np.cumsum(is_new) - 1
+        return ids
+
     def _merge_z0_vertices(self, stl_mesh: mesh.Mesh, pixel_size_mm: float) -> mesh.Mesh:
         """Merge vertices at z=0 that should be at the same position.
 
@@ -398,17 +404,19 @@ class STLGenerator:
         """
         z_tolerance = 1e-5
 
-        # Build a map of X -> list of (triangle_idx, vertex_idx, y_value) for z=0 vertices
-        x_groups = {}
-        for i, triangle in enumerate(stl_mesh.vectors):
-            for j, vertex in enumerate(triangle):
-                if abs(vertex[2]) < z_tolerance:
-                    # Snap X to pixel grid to group vertices
-                    x_key = round(vertex[0] / pixel_size_mm) * pixel_size_mm
-                    x_key = round(x_key, 6)  # Avoid float precision issues in key
-                    if x_key not in x_groups:
-                        x_groups[x_key] = []
-                    x_groups[x_key].append((i, j, vertex[1]))
+        # Locate the z=0 vertices as (triangle_idx, vertex_idx) pairs
+        tri_idx, vert_idx = np.nonzero(np.abs(stl_mesh.vectors[:, :, 2]) < z_tolerance)
+        if len(tri_idx) == 0:
+            return stl_mesh
+
+        # Snap X to the pixel grid to group vertices, round Y to avoid float noise
+        x_keys = np.round(stl_mesh.vectors[tri_idx, vert_idx, 0] / pixel_size_mm).astype(np.int64)
+        y_values = np.round(stl_mesh.vectors[tri_idx, vert_idx, 1], 6)
+
+        # Sort by X group, then Y
+        order = np.lexsort((y_values, x_keys))
+        x_sorted = x_keys[order]
+        y_sorted = y_values[order]
 
         # For each X group, find clusters of Y values and merge them
         # The merge tolerance needs to be large enough to cover the Y-compensation
@@ -417,92 +425,62 @@ class STLGenerator:
         # Use a larger tolerance that covers typical height variations.
         merge_tolerance = pixel_size_mm * 2.0  # 2 pixels covers most height diffs
 
-        for x_key, vertices in x_groups.items():
-            if len(vertices) <= 1:
-                continue
-
-            # Sort by Y value
-            y_values = sorted(set(round(v[2], 6) for v in vertices))
-
-            # Group Y values that are close together
-            y_clusters = []
-            current_cluster = [y_values[0]]
-            for y in y_values[1:]:
-                if y - current_cluster[-1] < merge_tolerance:
-                    current_cluster.append(y)
-                else:
-                    y_clusters.append(current_cluster)
-                    current_cluster = [y]
-            y_clusters.append(current_cluster)
-
-            # Create mapping from original Y to canonical Y (mean of cluster)
-            y_map = {}
-            for cluster in y_clusters:
-                canonical_y = sum(cluster) / len(cluster)
-                canonical_y = round(canonical_y, 6)
-                for y in cluster:
-                    y_map[y] = canonical_y
-
-            # Apply the mapping
-            for tri_idx, vert_idx, orig_y in vertices:
-                rounded_y = round(orig_y, 6)
-                if rounded_y in y_map:
-                    stl_mesh.vectors[tri_idx][vert_idx][1] = y_map[rounded_y]
-
-        return stl_mesh
-
-    def _merge_close_vertices(self, stl_mesh: mesh.Mesh, tolerance: float = 1e-6) -> mesh.Mesh:
-        """Merge vertices that are very close together to avoid numeric precision issues"""
-        # Flatten all vertices from all triangles
-        all_vertices = stl_mesh.vectors.reshape(-1, 3)
-
-        # Find unique vertices with tolerance
-        unique_vertices = []
-        vertex_map = {}  # maps original vertex tuple to unique index
-
-        for v in all_vertices:
-            v_tuple = tuple(np.round(v / tolerance) * tolerance)
-            if v_tuple not in vertex_map:
-                vertex_map[v_tuple] = len(unique_vertices)
-                unique_vertices.append(v_tuple)
-
-        # Reconstruct mesh with merged vertices
-        for i, triangle in enumerate(stl_mesh.vectors):
-            for j, vertex in enumerate(triangle):
-                v_tuple = tuple(np.round(vertex / tolerance) * tolerance)
-                # Update vertex to the canonical position
-                stl_mesh.vectors[i][j] = np.array(v_tuple)
+        # Distinct (X group, Y) values, in sorted order
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = x_sorted[1:] != x_sorted[:-1]
+        is_distinct = new_group.copy()
+        is_distinct[1:] |= y_sorted[1:] != y_sorted[:-1]
+        distinct_x = x_sorted[is_distinct]
+        distinct_y = y_sorted[is_distinct]
+
+        # A new Y cluster starts at each new X group or at a gap in Y
+        cluster_start = np.ones(len(distinct_y), dtype=bool)
+        cluster_start[1:] = (distinct_x[1:] != distinct_x[:-1]) | ~(np.diff(distinct_y) < merge_tolerance)
+        starts = np.flatnonzero(cluster_start)
+        counts = np.diff(np.append(starts, len(distinct_y))).astype(np.float32)
+
+        # Canonical Y of each cluster is the mean of its distinct values
+        canonical_y = np.round(np.add.reduceat(distinct_y, starts) / counts, 6)
+        cluster_of_distinct = np.cumsum(cluster_start) - 1
+        merged_y = canonical_y[cluster_of_distinct[np.cumsum(is_distinct) - 1]]
+
+        # X groups with a single vertex are left untouched
+        group_starts = np.flatnonzero(new_group)
+        group_sizes = np.diff(np.append(group_starts, len(order)))
+        shared = np.repeat(group_sizes > 1, group_sizes)
+
+        # Apply the mapping
+        target = order[shared]
+        stl_mesh.vectors[tri_idx[target], vert_idx[target], 1] = merged_y[shared]
 
         return stl_mesh
 
     def _remove_degenerate_triangles(self, stl_mesh: mesh.Mesh) -> mesh.Mesh:
         """Remove triangles where vertices have collapsed to the same position"""
         tolerance = 1e-6
-        valid_indices = []
-
-        for i, triangle in enumerate(stl_mesh.vectors):
-            v0, v1, v2 = triangle
-            # Check if any two vertices are too close (degenerate)
-            d01 = np.linalg.norm(v1 - v0)
-            d12 = np.linalg.norm(v2 - v1)
-            d20 = np.linalg.norm(v0 - v2)
-            if d01 > tolerance and d12 > tolerance and d20 > tolerance:
-                valid_indices.append(i)
-
-        if len(valid_indices) == len(stl_mesh.vectors):
+        v = stl_mesh.vectors
+
+        # Check if any two vertices are too close (degenerate)
+        d01 = np.linalg.norm(v[:, 1] - v[:, 0], axis=1)
+        d12 = np.linalg.norm(v[:, 2] - v[:, 1], axis=1)
+        d20 = np.linalg.norm(v[:, 0] - v[:, 2], axis=1)
+        valid = (d01 > tolerance) & (d12 > tolerance) & (d20 > tolerance)
+
+        if valid.all():
             return stl_mesh  # No degenerate triangles
 
         # Create new mesh with only valid triangles
-        new_mesh = mesh.Mesh(np.zeros(len(valid_indices), dtype=mesh.Mesh.dtype))
-        for new_idx, old_idx in enumerate(valid_indices):
-            new_mesh.vectors[new_idx] = stl_mesh.vectors[old_idx]
+        new_mesh = mesh.Mesh(np.zeros(np.count_nonzero(valid), dtype=mesh.Mesh.dtype))
+        new_mesh.vectors[:] = v[valid]
 
         return new_mesh
 
     def save(self, filepath: str):
-        """Save the mesh to an STL file"""
+        """Save the mesh to a binary STL file"""
         if self.mesh is not None:
-            self.mesh.save(filepath)
+            # numpy-stl computes normals and writes binary data in bulk; the
+            # ASCII writer formats every triangle in Python, so never pick it
+            self.mesh.save(filepath, mode=stl.Mode.BINARY)
         else:
             raise ValueError("No mesh generated. Call generate_from_heightmap first.")
 
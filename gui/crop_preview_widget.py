@@ -1,9 +1,11 @@
 """
 Interactive crop preview widget with draggable crop box and corner handles
 """
+from collections import OrderedDict
+
 from PySide6.QtWidgets import QWidget, QSizePolicy
-from PySide6.QtCore import Qt, Signal, QRectF, QPointF
-from PySide6.QtGui import QPainter, QPixmap, QPen, QBrush, QColor, QImage
+from PySide6.QtCore import Qt, Signal, QRectF, QPointF, QTimer
+from PySide6.QtGui import QPainter, QPixmap, QPen, QBrush, QColor, QImage, QImageReader, QRegion
 
 
 class CropPreviewWidget(QWidget):
@@ -25,6 +27,10 @@ class CropPreviewWidget(QWidget):
     HANDLE_FILL = QColor(255, 255, 255, 255)
     HANDLE_BORDER = QColor(100, 100, 100, 255)
     OVERLAY_COLOR = QColor(0, 0, 0, 100)
+    MIN_CROP_SIZE = 0.05  # Smallest crop width/height as a fraction of the image
+    SCALE_CACHE_SIZE = 4  # Smoothly scaled pixmaps kept for recently used sizes
+    SMOOTH_RESCALE_DELAY_MS = 150  # Idle time after a resize before the smooth rescale
+    MAX_SOURCE_SIZE = 2048  # Longest side kept for display; larger images are downsampled on load
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -32,9 +38,17 @@ class CropPreviewWidget(QWidget):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setMouseTracking(True)
 
-        self._pixmap = None
+        self._source = None  # Display copy of the image, premultiplied ARGB32
         self._scaled_pixmap = None
         self._image_rect = QRectF()  # Where the image is drawn in widget coords
+        self._scale_cache = OrderedDict()  # (source cacheKey, by_height, length) -> QPixmap
+
+        # While the widget is being resized the image is scaled with the fast
+        # filter; the smooth rescale runs once the size settles
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(self.SMOOTH_RESCALE_DELAY_MS)
+        self._smooth_timer.timeout.connect(self._smooth_rescale)
 
         # Crop box in normalized coordinates (0-1 relative to image)
         self._crop_x = 0.0
@@ -42,6 +56,14 @@ class CropPreviewWidget(QWidget):
         self._crop_w = 1.0
         self._crop_h = 1.0
 
+        # Crop box and corner handle rects in widget coords, kept in sync by _invalidate_geom
+        self._crop_widget_rect = QRectF()
+        self._handle_tl = QRectF()
+        self._handle_tr = QRectF()
+        self._handle_bl = QRectF()
+        self._handle_br = QRectF()
+        self._handles = (self._handle_tl, self._handle_tr, self._handle_bl, self._handle_br)
+
         # Interaction state
         self._dragging = False
         self._resizing_handle = None  # 'tl', 'tr', 'bl', 'br' or None
@@ -52,20 +74,37 @@ class CropPreviewWidget(QWidget):
 
     def set_image(self, file_path: str):
         """Load and display an image from file path"""
-        self._pixmap = QPixmap(file_path)
-        self._update_scaled_pixmap()
-        self.update()
+        # Large files are decoded straight to display size (libjpeg can skip
+        # most of the work) instead of decoding in full and scaling down
+        reader = QImageReader(file_path)
+        size = reader.size()
+        limit = self.MAX_SOURCE_SIZE
+        if size.isValid() and (size.width() > limit or size.height() > limit):
+            reader.setScaledSize(size.scaled(limit, limit, Qt.KeepAspectRatio))
+        self._set_source(reader.read())
 
     def set_pixmap(self, pixmap: QPixmap):
         """Set the pixmap directly"""
-        self._pixmap = pixmap
+        self._set_source(pixmap.toImage())
+
+    def _set_source(self, image: QImage):
+        """Keep a display-sized, premultiplied copy of the image and rescale"""
+        if image.isNull():
+            self._source = None
+        else:
+            limit = self.MAX_SOURCE_SIZE
+            if image.width() > limit or image.height() > limit:
+                image = image.scaled(limit, limit, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._source = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
         self._update_scaled_pixmap()
         self.update()
 
     def clear_image(self):
         """Clear the current image"""
-        self._pixmap = None
+        self._source = None
         self._scaled_pixmap = None
+        self._image_rect = QRectF()
+        self._invalidate_geom()
         self.update()
 
     def get_crop_rect(self) -> tuple:
@@ -77,10 +116,13 @@ class CropPreviewWidget(QWidget):
 
     def set_crop_rect(self, x: float, y: float, w: float, h: float):
         """Set the crop rectangle in normalized coordinates (0-1)"""
-        self._crop_x = max(0.0, min(1.0, x))
-        self._crop_y = max(0.0, min(1.0, y))
-        self._crop_w = max(0.05, min(1.0 - self._crop_x, w))
-        self._crop_h = max(0.05, min(1.0 - self._crop_y, h))
+        clamp = self._clamp
+        min_size = self.MIN_CROP_SIZE
+        self._crop_x = clamp(x, 0.0, 1.0)
+        self._crop_y = clamp(y, 0.0, 1.0)
+        self._crop_w = clamp(w, min_size, 1.0 - self._crop_x)
+        self._crop_h = clamp(h, min_size, 1.0 - self._crop_y)
+        self._invalidate_geom()
         self.update()
 
     def reset_crop(self):
@@ -89,36 +131,55 @@ class CropPreviewWidget(QWidget):
         self._crop_y = 0.0
         self._crop_w = 1.0
         self._crop_h = 1.0
+        self._invalidate_geom()
         self.update()
         self.crop_changed.emit(self._crop_x, self._crop_y, self._crop_w, self._crop_h)
 
-    def _update_scaled_pixmap(self):
+    def _update_scaled_pixmap(self, smooth: bool = True):
         """Update the scaled pixmap based on widget size"""
-        if self._pixmap is None or self._pixmap.isNull():
+        if self._source is None:
             self._scaled_pixmap = None
             self._image_rect = QRectF()
+            self._invalidate_geom()
             return
 
-        # Scale pixmap to fit widget while maintaining aspect ratio
+        # Scale image to fit widget while maintaining aspect ratio: whichever
+        # side limits the fit is scaled to the widget, the other follows
         widget_rect = self.rect()
-        pixmap_size = self._pixmap.size()
-
-        # Calculate scaled size
-        scaled_size = pixmap_size.scaled(
-            widget_rect.size(),
-            Qt.KeepAspectRatio
-        )
-
-        self._scaled_pixmap = self._pixmap.scaled(
-            scaled_size,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
+        sw, sh = widget_rect.width(), widget_rect.height()
+        pw, ph = self._source.width(), self._source.height()
+        by_height = pw * sh <= ph * sw
+        length = sh if by_height else sw
+
+        key = (self._source.cacheKey(), by_height, length)
+        cached = self._scale_cache.get(key)
+        if cached is not None:
+            self._scale_cache.move_to_end(key)
+            self._scaled_pixmap = cached
+        else:
+            mode = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+            if by_height:
+                scaled = self._source.scaledToHeight(length, mode)
+            else:
+                scaled = self._source.scaledToWidth(length, mode)
+            self._scaled_pixmap = QPixmap.fromImage(scaled)
+            if smooth:
+                self._scale_cache[key] = self._scaled_pixmap
+                if len(self._scale_cache) > self.SCALE_CACHE_SIZE:
+                    self._scale_cache.popitem(last=False)
 
         # Calculate image rectangle (centered in widget)
         x = (widget_rect.width() - self._scaled_pixmap.width()) / 2
         y = (widget_rect.height() - self._scaled_pixmap.height()) / 2
         self._image_rect = QRectF(x, y, self._scaled_pixmap.width(), self._scaled_pixmap.height())
+        self._invalidate_geom()
+
+    @staticmethod
+    def _clamp(v: float, lo: float, hi: float) -> float:
+        """Same as max(lo, min(hi, v)) without the builtin call overhead"""
+        if v > hi:
+            v = hi
+        return lo if v < lo else v
 
     def _get_crop_box_widget_rect(self) -> QRectF:
         """Get the crop box rectangle in widget coordinates"""
@@ -132,26 +193,37 @@ class CropPreviewWidget(QWidget):
 
         return QRectF(x, y, w, h)
 
-    def _get_handle_rects(self) -> dict:
-        """Get rectangles for each corner handle"""
-        crop_rect = self._get_crop_box_widget_rect()
+    def _invalidate_geom(self):
+        """Recompute the cached crop box rect and its handles"""
+        self._crop_widget_rect = self._get_crop_box_widget_rect()
+        self._recompute_handles()
+
+    def _recompute_handles(self):
+        """Move the cached corner handle rects to the current crop box"""
+        crop_rect = self._crop_widget_rect
         if crop_rect.isEmpty():
-            return {}
+            for rect in self._handles:
+                rect.setRect(0, 0, 0, 0)
+            return
 
         r = self.HANDLE_RADIUS
-        return {
-            'tl': QRectF(crop_rect.left() - r, crop_rect.top() - r, r * 2, r * 2),
-            'tr': QRectF(crop_rect.right() - r, crop_rect.top() - r, r * 2, r * 2),
-            'bl': QRectF(crop_rect.left() - r, crop_rect.bottom() - r, r * 2, r * 2),
-            'br': QRectF(crop_rect.right() - r, crop_rect.bottom() - r, r * 2, r * 2),
-        }
+        left, top = crop_rect.left() - r, crop_rect.top() - r
+        right, bottom = crop_rect.right() - r, crop_rect.bottom() - r
+        self._handle_tl.setRect(left, top, r * 2, r * 2)
+        self._handle_tr.setRect(right, top, r * 2, r * 2)
+        self._handle_bl.setRect(left, bottom, r * 2, r * 2)
+        self._handle_br.setRect(right, bottom, r * 2, r * 2)
 
     def _point_in_handle(self, pos: QPointF) -> str:
         """Check if point is in any handle, return handle name or None"""
-        handles = self._get_handle_rects()
-        for name, rect in handles.items():
-            if rect.contains(pos):
-                return name
+        if self._handle_tl.contains(pos):
+            return 'tl'
+        if self._handle_tr.contains(pos):
+            return 'tr'
+        if self._handle_bl.contains(pos):
+            return 'bl'
+        if self._handle_br.contains(pos):
+            return 'br'
         return None
 
     def _widget_to_normalized(self, pos: QPointF) -> tuple:
@@ -166,12 +238,17 @@ class CropPreviewWidget(QWidget):
     def resizeEvent(self, event):
         """Handle widget resize"""
         super().resizeEvent(event)
+        self._update_scaled_pixmap(smooth=False)
+        self._smooth_timer.start()
+
+    def _smooth_rescale(self):
+        """Replace the fast-scaled pixmap once resizing has stopped"""
         self._update_scaled_pixmap()
+        self.update()
 
     def paintEvent(self, event):
         """Paint the widget"""
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
 
         # Fill background
         painter.fillRect(self.rect(), QColor(51, 51, 51))
@@ -186,52 +263,31 @@ class CropPreviewWidget(QWidget):
         painter.drawPixmap(self._image_rect.topLeft(), self._scaled_pixmap)
 
         # Get crop box in widget coords
-        crop_rect = self._get_crop_box_widget_rect()
-
-        # Draw semi-transparent overlay outside crop area
-        overlay_color = self.OVERLAY_COLOR
-
-        # Top region
-        if crop_rect.top() > self._image_rect.top():
-            painter.fillRect(QRectF(
-                self._image_rect.left(), self._image_rect.top(),
-                self._image_rect.width(), crop_rect.top() - self._image_rect.top()
-            ), overlay_color)
-
-        # Bottom region
-        if crop_rect.bottom() < self._image_rect.bottom():
-            painter.fillRect(QRectF(
-                self._image_rect.left(), crop_rect.bottom(),
-                self._image_rect.width(), self._image_rect.bottom() - crop_rect.bottom()
-            ), overlay_color)
-
-        # Left region (between top and bottom overlays)
-        if crop_rect.left() > self._image_rect.left():
-            painter.fillRect(QRectF(
-                self._image_rect.left(), crop_rect.top(),
-                crop_rect.left() - self._image_rect.left(), crop_rect.height()
-            ), overlay_color)
-
-        # Right region (between top and bottom overlays)
-        if crop_rect.right() < self._image_rect.right():
-            painter.fillRect(QRectF(
-                crop_rect.right(), crop_rect.top(),
-                self._image_rect.right() - crop_rect.right(), crop_rect.height()
-            ), overlay_color)
+        crop_rect = self._crop_widget_rect
+
+        # Draw semi-transparent overlay outside crop area: clip to the image
+        # minus the crop box so a single fill covers exactly the outside
+        outside = QRegion(self._image_rect.toAlignedRect()).subtracted(QRegion(crop_rect.toAlignedRect()))
+        painter.save()
+        painter.setClipRegion(outside)
+        painter.fillRect(self._image_rect, self.OVERLAY_COLOR)
+        painter.restore()
 
         # Draw crop box border
         pen = QPen(self.CROP_BOX_BORDER)
         pen.setWidth(2)
         painter.setPen(pen)
         painter.setBrush(Qt.NoBrush)
-        painter.drawRect(crop_rect)
+        painter.drawRect(crop_rect.toAlignedRect())
 
         # Draw corner handles
-        handles = self._get_handle_rects()
-        for name, rect in handles.items():
-            # Handle fill
-            painter.setPen(QPen(self.HANDLE_BORDER, 1))
-            painter.setBrush(QBrush(self.HANDLE_FILL))
+        if crop_rect.isEmpty():
+            return
+        painter.setPen(QPen(self.HANDLE_BORDER, 1))
+        painter.setBrush(QBrush(self.HANDLE_FILL))
+        # Only the round handles need antialiasing; fills and the border are axis-aligned
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        for rect in self._handles:
             painter.drawEllipse(rect)
 
     def mousePressEvent(self, event):
@@ -250,7 +306,7 @@ class CropPreviewWidget(QWidget):
             return
 
         # Check if clicking inside crop box
-        crop_rect = self._get_crop_box_widget_rect()
+        crop_rect = self._crop_widget_rect
         if crop_rect.contains(pos):
             self._dragging = True
             self._drag_start = pos
@@ -262,7 +318,7 @@ class CropPreviewWidget(QWidget):
 
         # Update cursor based on position
         handle = self._point_in_handle(pos)
-        crop_rect = self._get_crop_box_widget_rect()
+        crop_rect = self._crop_widget_rect
 
         if handle in ('tl', 'br'):
             self.setCursor(Qt.SizeFDiagCursor)
@@ -284,6 +340,10 @@ class CropPreviewWidget(QWidget):
         dy = (pos.y() - self._drag_start.y()) / self._image_rect.height()
 
         start_x, start_y, start_w, start_h = self._crop_start
+        clamp = self._clamp
+        min_size = self.MIN_CROP_SIZE
+        right = start_x + start_w
+        bottom = start_y + start_h
 
         if self._resizing_handle:
             # Resizing a corner
@@ -291,53 +351,43 @@ class CropPreviewWidget(QWidget):
 
             if handle == 'tl':
                 # Top-left: adjust x, y, and size
-                new_x = max(0, min(start_x + start_w - 0.05, start_x + dx))
-                new_y = max(0, min(start_y + start_h - 0.05, start_y + dy))
-                new_w = start_w - (new_x - start_x)
-                new_h = start_h - (new_y - start_y)
+                new_x = clamp(start_x + dx, 0.0, right - min_size)
+                new_y = clamp(start_y + dy, 0.0, bottom - min_size)
                 self._crop_x = new_x
                 self._crop_y = new_y
-                self._crop_w = new_w
-                self._crop_h = new_h
+                self._crop_w = right - new_x
+                self._crop_h = bottom - new_y
 
             elif handle == 'tr':
                 # Top-right: adjust y, width, and height
-                new_y = max(0, min(start_y + start_h - 0.05, start_y + dy))
-                new_w = max(0.05, min(1.0 - start_x, start_w + dx))
-                new_h = start_h - (new_y - start_y)
+                new_y = clamp(start_y + dy, 0.0, bottom - min_size)
                 self._crop_y = new_y
-                self._crop_w = new_w
-                self._crop_h = new_h
+                self._crop_w = clamp(start_w + dx, min_size, 1.0 - start_x)
+                self._crop_h = bottom - new_y
 
             elif handle == 'bl':
                 # Bottom-left: adjust x, width, and height
-                new_x = max(0, min(start_x + start_w - 0.05, start_x + dx))
-                new_w = start_w - (new_x - start_x)
-                new_h = max(0.05, min(1.0 - start_y, start_h + dy))
+                new_x = clamp(start_x + dx, 0.0, right - min_size)
                 self._crop_x = new_x
-                self._crop_w = new_w
-                self._crop_h = new_h
+                self._crop_w = right - new_x
+                self._crop_h = clamp(start_h + dy, min_size, 1.0 - start_y)
 
             elif handle == 'br':
                 # Bottom-right: adjust width and height
-                new_w = max(0.05, min(1.0 - start_x, start_w + dx))
-                new_h = max(0.05, min(1.0 - start_y, start_h + dy))
-                self._crop_w = new_w
-                self._crop_h = new_h
+                self._crop_w = clamp(start_w + dx, min_size, 1.0 - start_x)
+                self._crop_h = clamp(start_h + dy, min_size, 1.0 - start_y)
 
         elif self._dragging:
-            # Moving the entire box
-            new_x = start_x + dx
-            new_y = start_y + dy
+            # Moving the entire box, clamped to image bounds
+            self._crop_x = clamp(start_x + dx, 0.0, 1.0 - start_w)
+            self._crop_y = clamp(start_y + dy, 0.0, 1.0 - start_h)
 
-            # Clamp to image bounds
-            new_x = max(0, min(1.0 - start_w, new_x))
-            new_y = max(0, min(1.0 - start_h, new_y))
+        self._invalidate_geom()
 
-            self._crop_x = new_x
-            self._crop_y = new_y
-
-        self.update()
+        # Only the area swept by the box, its border and handles needs repainting
+        r = self.HANDLE_RADIUS + 2
+        dirty = crop_rect.united(self._crop_widget_rect).adjusted(-r, -r, r, r)
+        self.update(dirty.toAlignedRect())
 
     def mouseReleaseEvent(self, event):
         """Handle mouse release"""
@@ -2,14 +2,17 @@
 Direct lithophane parameter controls with sliders and text inputs
 """
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel,
     QSlider, QDoubleSpinBox, QSpinBox, QCheckBox,
     QRadioButton, QButtonGroup, QGroupBox, QScrollArea,
     QFrame, QComboBox
 )
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Signal, Slot, Qt, QTimer, QSignalBlocker, QMargins
 from PySide6.QtGui import QWheelEvent
 
+# Shared by every SliderWithInput layout
+_SLIDER_MARGINS = QMargins(0, 0, 0, 5)
+
 
 class NoScrollDoubleSpinBox(QDoubleSpinBox):
     """DoubleSpinBox that ignores mouse wheel events"""
@@ -27,96 +30,180 @@ class SliderWithInput(QWidget):
     """A slider with a synchronized text input.
 
     Only emits value_changed when:
-    - Slider is released (not while dragging)
-    - Enter is pressed in the spinbox
+    - Slider is released
+    - Slider pauses mid-drag, for a live slider
+    - A new value is committed in the spinbox (Enter or focus out)
     """
     value_changed = Signal(float)
 
+    LIVE_DEBOUNCE_MS = 200  # Rest time before a live slider emits mid-drag
+
     def __init__(self, label: str, min_val: float, max_val: float,
-                 default: float, decimals: int = 2, parent=None):
+                 default: float, decimals: int = 2, live: bool = False, parent=None):
         super().__init__(parent)
         self.decimals = decimals
         self.multiplier = 10 ** decimals
+        self._inv_mul = 1.0 / self.multiplier
+        self._eps = 0.5 / self.multiplier  # Half a slider step: closer values are already in sync
 
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 5)
+        # One grid: label across the top, slider and spinbox below it
+        layout = QGridLayout(self)
+        layout.setContentsMargins(_SLIDER_MARGINS)
+        layout.setColumnStretch(0, 3)
+        layout.setColumnStretch(1, 1)
 
         # Label
         self.label = QLabel(label)
-        layout.addWidget(self.label)
-
-        # Slider and spinbox row
-        row = QHBoxLayout()
+        layout.addWidget(self.label, 0, 0, 1, 2)
 
         # Slider (no scroll)
         self.slider = NoScrollSlider(Qt.Horizontal)
-        self.slider.setMinimum(int(min_val * self.multiplier))
-        self.slider.setMaximum(int(max_val * self.multiplier))
+        self.slider.setRange(int(min_val * self.multiplier), int(max_val * self.multiplier))
         self.slider.setValue(int(default * self.multiplier))
         # Sync spinbox display while dragging (but don't emit signal)
         self.slider.valueChanged.connect(self._on_slider_moved)
         # Only emit signal when slider is released
         self.slider.sliderReleased.connect(self._on_slider_released)
-        row.addWidget(self.slider, stretch=3)
+        layout.addWidget(self.slider, 1, 0)
 
         # Spinbox (no scroll)
         self.spinbox = NoScrollDoubleSpinBox()
-        self.spinbox.setMinimum(min_val)
-        self.spinbox.setMaximum(max_val)
+        # Decimals first so the range is only rounded once
         self.spinbox.setDecimals(decimals)
+        self.spinbox.setRange(min_val, max_val)
         self.spinbox.setValue(default)
         self.spinbox.setKeyboardTracking(False)  # Don't emit while typing
-        # Only emit when Enter is pressed (not on focus loss, which causes loops with dialogs)
-        self.spinbox.lineEdit().returnPressed.connect(self._on_spinbox_enter_pressed)
-        row.addWidget(self.spinbox, stretch=1)
-
-        layout.addLayout(row)
-
-        self._updating = False
-
+        # editingFinished also fires on focus loss (e.g. when a dialog opens), so only
+        # a value different from the last one emitted counts as a commit
+        self.spinbox.editingFinished.connect(self._on_spinbox_committed)
+        self._committed = self.spinbox.value()
+        layout.addWidget(self.spinbox, 1, 1)
+
+        # Optional live emission while dragging, after the slider rests this long
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.LIVE_DEBOUNCE_MS if live else 0)
+        self._debounce.timeout.connect(self._on_drag_paused)
+        self._live_value = None  # Value already emitted during the current drag
+
+    @Slot(int)
     def _on_slider_moved(self, value):
-        """Sync spinbox display while slider is being dragged (no signal emission)"""
-        if self._updating:
+        """Sync spinbox display with the slider (no signal emission)"""
+        if self.slider.isSliderDown():
+            # Mid-drag only the text follows the slider; the spinbox value
+            # itself is synced once on release
+            self.spinbox.lineEdit().setText(self.spinbox.textFromValue(value * self._inv_mul))
+            if self._debounce.interval() > 0:
+                self._debounce.start()
             return
-        self._updating = True
-        float_val = value / self.multiplier
-        self.spinbox.setValue(float_val)
-        self._updating = False
+        self._sync_spinbox(value)
 
-    def _on_slider_released(self):
-        """Emit signal only when slider is released"""
-        if self._updating:
+    def _sync_spinbox(self, ticks: int):
+        """Set the spinbox to the value of the given slider position"""
+        float_val = ticks * self._inv_mul
+        if abs(float_val - self.spinbox.value()) < self._eps:
             return
-        self.value_changed.emit(self.spinbox.value())
+        with QSignalBlocker(self.spinbox):
+            self.spinbox.setValue(float_val)
 
-    def _on_spinbox_enter_pressed(self):
-        """Emit signal when Enter is pressed in spinbox"""
-        if self._updating:
+    @Slot()
+    def _on_drag_paused(self):
+        """Emit the value the slider is resting on mid-drag"""
+        self._live_value = self._committed = self.value()
+        self.value_changed.emit(self._live_value)
+
+    @Slot()
+    def _on_slider_released(self):
+        """Emit signal when slider is released, unless the drag already emitted this value"""
+        self._debounce.stop()
+        self._sync_spinbox(self.slider.value())
+        value = self.spinbox.value()
+        live_value, self._live_value = self._live_value, None
+        if value != live_value:
+            self._committed = value
+            self.value_changed.emit(value)
+
+    @Slot()
+    def _on_spinbox_committed(self):
+        """Emit signal when a new value is committed in the spinbox"""
+        value = self.spinbox.value()
+        if value == self._committed:
             return
-        self._updating = True
-        self.slider.setValue(int(self.spinbox.value() * self.multiplier))
-        self._updating = False
-        self.value_changed.emit(self.spinbox.value())
+        slider_val = int(value * self.multiplier)
+        if slider_val != self.slider.value():
+            with QSignalBlocker(self.slider):
+                self.slider.setValue(slider_val)
+        self._committed = value
+        self.value_changed.emit(value)
 
     def value(self) -> float:
+        if self.slider.isSliderDown():
+            return self.slider.value() / self.multiplier
         return self.spinbox.value()
 
     def setValue(self, val: float):
-        self._updating = True
-        self.spinbox.setValue(val)
-        self.slider.setValue(int(val * self.multiplier))
-        self._updating = False
+        if abs(self.spinbox.value() - val) < self._eps:
+            return
+        with QSignalBlocker(self.spinbox), QSignalBlocker(self.slider):
+            self.spinbox.setValue(val)
+            self.slider.setValue(int(val * self.multiplier))
+        self._committed = self.spinbox.value()
 
 
 class LithophaneControls(QWidget):
     """Direct controls for lithophane parameters"""
-    parameters_changed = Signal()
+    parameters_changed = Signal(set)  # Keys of the parameters that changed
+
+    EMIT_DELAY_MS = 50  # Bursts of changes within this window emit parameters_changed once
+
+    # Border texture names in combo box order
+    _TEXTURE_NAMES = ("solid", "gradient", "ribbed", "dotted", "wave", "crosshatch")
+    _TEXTURE_INDEX = {name: i for i, name in enumerate(_TEXTURE_NAMES)}
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._updating = False
+
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setInterval(self.EMIT_DELAY_MS)
+        self._emit_timer.timeout.connect(self._emit_parameters)
+
+        # One bound method shared by every control connection
+        self._emit_changed_slot = self._emit_changed
+
         self._setup_ui()
 
+        # Parameter key for each slider control
+        self._slider_params = (
+            ("width_mm", self.width_control),
+            ("height_mm", self.height_control),
+            ("min_thickness_mm", self.min_thickness_control),
+            ("max_thickness_mm", self.max_thickness_control),
+            ("pixels_per_mm", self.resolution_control),
+            ("blur_mm", self.blur_control),
+            ("angle", self.angle_control),
+            ("background_tint", self.background_tint_control),
+            ("border_width_mm", self.border_width_control),
+            ("border_intensity", self.border_intensity_control),
+        )
+
+        # Reused by get_parameters; fixes the key order of the returned dict and
+        # holds the last values read until a control changes
+        self._params_template = dict.fromkeys((
+            "width_mm", "height_mm", "min_thickness_mm", "max_thickness_mm",
+            "pixels_per_mm", "blur_mm", "angle", "crop_mode", "background_tint",
+            "border_width_mm", "border_intensity", "border_texture", "invert",
+        ))
+        self._params_dirty = True
+        self._last_params = self.get_parameters()  # As of the last emit, for the changed-keys diff
+
+        # A released slider is a final value, so don't make it wait for the timer
+        for control in self.findChildren(SliderWithInput):
+            control.slider.sliderReleased.connect(self._flush_changed, Qt.UniqueConnection)
+            # Slider drags and typed values change the state before anything is emitted
+            control.slider.valueChanged.connect(self._invalidate_parameters)
+            control.spinbox.valueChanged.connect(self._invalidate_parameters)
+
     def _setup_ui(self):
         # Use scroll area for many controls
         scroll = QScrollArea()
@@ -132,11 +219,11 @@ class LithophaneControls(QWidget):
         dims_layout = QVBoxLayout(dims_group)
 
         self.width_control = SliderWithInput("Width (mm)", 10, 300, 100, decimals=1)
-        self.width_control.value_changed.connect(self._emit_changed)
+        self.width_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         dims_layout.addWidget(self.width_control)
 
         self.height_control = SliderWithInput("Height (mm)", 10, 300, 100, decimals=1)
-        self.height_control.value_changed.connect(self._emit_changed)
+        self.height_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         dims_layout.addWidget(self.height_control)
 
         layout.addWidget(dims_group)
@@ -146,11 +233,11 @@ class LithophaneControls(QWidget):
         thick_layout = QVBoxLayout(thick_group)
 
         self.min_thickness_control = SliderWithInput("Min Thickness (mm) - bright areas", 0.3, 3.0, 0.8, decimals=2)
-        self.min_thickness_control.value_changed.connect(self._emit_changed)
+        self.min_thickness_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         thick_layout.addWidget(self.min_thickness_control)
 
         self.max_thickness_control = SliderWithInput("Max Thickness (mm) - dark areas", 1.0, 10.0, 5.0, decimals=2)
-        self.max_thickness_control.value_changed.connect(self._emit_changed)
+        self.max_thickness_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         thick_layout.addWidget(self.max_thickness_control)
 
         layout.addWidget(thick_group)
@@ -160,11 +247,12 @@ class LithophaneControls(QWidget):
         quality_layout = QVBoxLayout(quality_group)
 
         self.resolution_control = SliderWithInput("Resolution (pixels/mm)", 0.5, 5.0, 2.0, decimals=1)
-        self.resolution_control.value_changed.connect(self._emit_changed)
+        self.resolution_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         quality_layout.addWidget(self.resolution_control)
 
-        self.blur_control = SliderWithInput("Blur (mm)", 0, 5, 0, decimals=1)
-        self.blur_control.value_changed.connect(self._emit_changed)
+        # Blur previews while dragging; the rest only emit on release
+        self.blur_control = SliderWithInput("Blur (mm)", 0, 5, 0, decimals=1, live=True)
+        self.blur_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         quality_layout.addWidget(self.blur_control)
 
         layout.addWidget(quality_group)
@@ -174,7 +262,7 @@ class LithophaneControls(QWidget):
         angle_layout = QVBoxLayout(angle_group)
 
         self.angle_control = SliderWithInput("Build Angle (degrees)", 0, 90, 75, decimals=0)
-        self.angle_control.value_changed.connect(self._emit_changed)
+        self.angle_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         angle_layout.addWidget(self.angle_control)
 
         layout.addWidget(angle_group)
@@ -194,11 +282,12 @@ class LithophaneControls(QWidget):
         self.crop_button_group.addButton(self.keep_full_radio, 1)
         crop_layout.addWidget(self.keep_full_radio)
 
-        self.crop_button_group.buttonClicked.connect(self._emit_changed)
+        # The radios are exclusive, so one toggled signal covers both
+        self.crop_to_size_radio.toggled.connect(self._on_crop_mode_changed)
 
         # Background tint (only for keep_full_image mode)
         self.background_tint_control = SliderWithInput("Background Tint (0%=thin, 100%=thick)", 0, 100, 0, decimals=0)
-        self.background_tint_control.value_changed.connect(self._emit_changed)
+        self.background_tint_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         crop_layout.addWidget(self.background_tint_control)
 
         layout.addWidget(crop_group)
@@ -208,11 +297,11 @@ class LithophaneControls(QWidget):
         border_layout = QVBoxLayout(border_group)
 
         self.border_width_control = SliderWithInput("Border Width (mm)", 0, 20, 0, decimals=1)
-        self.border_width_control.value_changed.connect(self._emit_changed)
+        self.border_width_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         border_layout.addWidget(self.border_width_control)
 
         self.border_intensity_control = SliderWithInput("Border Intensity (0%=thin, 100%=thick)", 0, 100, 50, decimals=0)
-        self.border_intensity_control.value_changed.connect(self._emit_changed)
+        self.border_intensity_control.value_changed.connect(self._emit_changed_slot, Qt.UniqueConnection)
         border_layout.addWidget(self.border_intensity_control)
 
         # Border texture dropdown
@@ -227,7 +316,7 @@ class LithophaneControls(QWidget):
             "Wave (sine pattern)",
             "Crosshatch"
         ])
-        self.border_texture_combo.currentIndexChanged.connect(self._emit_changed)
+        self.border_texture_combo.currentIndexChanged.connect(self._on_texture_changed)
         texture_row.addWidget(self.border_texture_combo)
         border_layout.addLayout(texture_row)
 
@@ -238,7 +327,7 @@ class LithophaneControls(QWidget):
         options_layout = QVBoxLayout(options_group)
 
         self.invert_checkbox = QCheckBox("Invert Colors")
-        self.invert_checkbox.stateChanged.connect(self._emit_changed)
+        self.invert_checkbox.toggled.connect(self._on_invert_toggled)
         options_layout.addWidget(self.invert_checkbox)
 
         layout.addWidget(options_group)
@@ -253,66 +342,91 @@ class LithophaneControls(QWidget):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.addWidget(scroll)
 
+    @Slot()
+    def _invalidate_parameters(self):
+        self._params_dirty = True
+
+    @Slot()
     def _emit_changed(self):
-        if not self._updating:
-            self.parameters_changed.emit()
+        self._params_dirty = True
+        self._emit_timer.start()
+
+    @Slot(bool)
+    def _on_crop_mode_changed(self, checked):
+        self._emit_changed()
+
+    @Slot(int)
+    def _on_texture_changed(self, index):
+        self._emit_changed()
+
+    @Slot(bool)
+    def _on_invert_toggled(self, checked):
+        self._emit_changed()
+
+    @Slot()
+    def _flush_changed(self):
+        """Emit a pending parameters_changed immediately"""
+        if self._emit_timer.isActive():
+            self._emit_timer.stop()
+            self._emit_parameters()
+
+    @Slot()
+    def _emit_parameters(self):
+        """Emit parameters_changed with the keys that differ from the last emit"""
+        params = self.get_parameters()
+        last = self._last_params
+        changed = {key for key, value in params.items() if value != last[key]}
+        self._last_params = params
+        if changed:
+            self.parameters_changed.emit(changed)
 
     def get_parameters(self) -> dict:
         """Get current parameters as a dictionary"""
-        crop_mode = "crop_to_size" if self.crop_to_size_radio.isChecked() else "keep_full_image"
-        # Map combo box index to texture name
-        texture_names = ["solid", "gradient", "ribbed", "dotted", "wave", "crosshatch"]
-        border_texture = texture_names[self.border_texture_combo.currentIndex()]
-        return {
-            "width_mm": self.width_control.value(),
-            "height_mm": self.height_control.value(),
-            "min_thickness_mm": self.min_thickness_control.value(),
-            "max_thickness_mm": self.max_thickness_control.value(),
-            "pixels_per_mm": self.resolution_control.value(),
-            "blur_mm": self.blur_control.value(),
-            "angle": self.angle_control.value(),
-            "crop_mode": crop_mode,
-            "background_tint": self.background_tint_control.value(),
-            "border_width_mm": self.border_width_control.value(),
-            "border_intensity": self.border_intensity_control.value(),
-            "border_texture": border_texture,
-            "invert": self.invert_checkbox.isChecked()
-        }
+        params = self._params_template
+        if self._params_dirty:
+            for key, control in self._slider_params:
+                params[key] = control.value()
+            params["crop_mode"] = "crop_to_size" if self.crop_to_size_radio.isChecked() else "keep_full_image"
+            params["border_texture"] = self._TEXTURE_NAMES[self.border_texture_combo.currentIndex()]
+            params["invert"] = self.invert_checkbox.isChecked()
+            self._params_dirty = False
+        return params.copy()
 
     def set_parameters(self, params: dict):
-        """Set parameters from a dictionary"""
-        self._updating = True
-
-        if "width_mm" in params:
-            self.width_control.setValue(params["width_mm"])
-        if "height_mm" in params:
-            self.height_control.setValue(params["height_mm"])
-        if "min_thickness_mm" in params:
-            self.min_thickness_control.setValue(params["min_thickness_mm"])
-        if "max_thickness_mm" in params:
-            self.max_thickness_control.setValue(params["max_thickness_mm"])
-        if "pixels_per_mm" in params:
-            self.resolution_control.setValue(params["pixels_per_mm"])
-        if "blur_mm" in params:
-            self.blur_control.setValue(params["blur_mm"])
-        if "angle" in params:
-            self.angle_control.setValue(params["angle"])
-        if "crop_mode" in params:
-            if params["crop_mode"] == "crop_to_size":
-                self.crop_to_size_radio.setChecked(True)
-            else:
-                self.keep_full_radio.setChecked(True)
-        if "background_tint" in params:
-            self.background_tint_control.setValue(params["background_tint"])
-        if "border_width_mm" in params:
-            self.border_width_control.setValue(params["border_width_mm"])
-        if "border_intensity" in params:
-            self.border_intensity_control.setValue(params["border_intensity"])
-        if "border_texture" in params:
-            texture_names = ["solid", "gradient", "ribbed", "dotted", "wave", "crosshatch"]
-            if params["border_texture"] in texture_names:
-                self.border_texture_combo.setCurrentIndex(texture_names.index(params["border_texture"]))
-        if "invert" in params:
-            self.invert_checkbox.setChecked(params["invert"])
-
-        self._updating = False
+        """Set parameters from a dictionary without emitting parameters_changed"""
+        self._params_dirty = True
+        # SliderWithInput.setValue is already silent; block the remaining inputs
+        blockers = [QSignalBlocker(w) for w in (
+            self.crop_to_size_radio, self.border_texture_combo, self.invert_checkbox
+        )]
+        try:
+            self._apply_parameters(params)
+        finally:
+            for blocker in blockers:
+                blocker.unblock()
+        self._last_params = self.get_parameters()
+
+    def cancel_pending(self):
+        """Drop a parameters_changed that is still waiting to be emitted"""
+        self._emit_timer.stop()
+
+    def _apply_parameters(self, params: dict):
+        """Write each parameter present in params to its control"""
+        for key, control in self._slider_params:
+            value = params.get(key)
+            if value is not None:
+                control.setValue(value)
+
+        crop_mode = params.get("crop_mode")
+        if crop_mode is not None:
+            radio = self.crop_to_size_radio if crop_mode == "crop_to_size" else self.keep_full_radio
+            if not radio.isChecked():
+                radio.setChecked(True)
+
+        index = self._TEXTURE_INDEX.get(params.get("border_texture"))
+        if index is not None and index != self.border_texture_combo.currentIndex():
+            self.border_texture_combo.setCurrentIndex(index)
+
+        invert = params.get("invert")
+        if invert is not None and self.invert_checkbox.isChecked() != invert:
+            self.invert_checkbox.setChecked(invert)
@@ -1,6 +1,8 @@
 """
 Main application window
 """
+import json
+import queue
 import random
 from pathlib import Path
 from PySide6.QtWidgets import (
@@ -8,47 +10,84 @@ from PySide6.QtWidgets import (
     QPushButton, QFileDialog, QMessageBox,
     QLabel, QGroupBox, QFrame, QDialog, QMenuBar, QMenu, QApplication
 )
-from PySide6.QtCore import Qt, QThread, Signal, QSize
+from PySide6.QtCore import Qt, QThread, Signal, QSize, QTimer
 from PySide6.QtGui import QPixmap, QImage, QMovie, QAction, QKeySequence
 from PIL import Image
 from gui.process_editor import ProcessEditor
 from gui.lithophane_controls import LithophaneControls
 from gui.crop_preview_widget import CropPreviewWidget
 from core.process import Process, Operation
-from core.image_processor import ImageProcessor
+from core.image_processor import ImageProcessor, ProcessCancelled
 from core.stl_generator import STLGenerator
 
 
 class ProcessingWorker(QThread):
-    """Background worker for image processing"""
-    finished = Signal(object)  # Emits the height_map or None on error
-    error = Signal(str)
+    """Long-lived background worker that processes queued jobs in order"""
+    finished = Signal(int, object)  # Emits the job id and its height_map
+    error = Signal(int, str)
 
-    def __init__(self, image_processor, stl_generator, image_path, process, crop_rect=None):
+    def __init__(self, image_processor, stl_generator):
         super().__init__()
         self.image_processor = image_processor
         self.stl_generator = stl_generator
-        self.image_path = image_path
-        self.process = process
-        self.crop_rect = crop_rect  # (x, y, w, h) normalized 0-1
+        self._jobs = queue.Queue()
+        self._stopped = False
 
-    def run(self):
+    def submit(self, job_id: int, image_path: str, process, crop_rect=None):
+        """Queue a job, dropping any queued job that has not started yet"""
+        if self._stopped:
+            return
+        self._drain()
+        self._jobs.put((job_id, image_path, process, crop_rect))
+        if not self.isRunning():
+            self.start()
+
+    def stop(self):
+        """Drop queued jobs, end the current one early and wait for the thread"""
+        self._stopped = True
+        self._drain()
+        self._jobs.put(None)
+        self.wait()
+
+    def _drain(self):
+        """Remove every job that is still waiting in the queue"""
         try:
-            # Process image with optional crop
-            height_map = self.image_processor.execute_process(
-                self.image_path,
-                self.process,
-                crop_rect=self.crop_rect
-            )
-
-            # Generate STL with correct pixel size for proper dimensions
-            angle = self.image_processor.get_angle()
-            pixel_size_mm = self.image_processor.get_pixel_size_mm()
-            self.stl_generator.generate_from_heightmap(height_map, pixel_size_mm=pixel_size_mm, angle=angle)
-
-            self.finished.emit(height_map)
-        except Exception as e:
-            self.error.emit(str(e))
+            while True:
+                self._jobs.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _superseded(self) -> bool:
+        """Whether a newer job (or a stop request) is waiting behind the current one"""
+        return not self._jobs.empty()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job_id, image_path, process, crop_rect = job
+            try:
+                # Process image with optional crop (x, y, w, h) normalized 0-1
+                height_map = self.image_processor.execute_process(
+                    image_path,
+                    process,
+                    crop_rect=crop_rect,
+                    cancel_check=self._superseded
+                )
+                if self._superseded():
+                    continue
+
+                # Generate STL with correct pixel size for proper dimensions
+                angle = self.image_processor.get_angle()
+                pixel_size_mm = self.image_processor.get_pixel_size_mm()
+                self.stl_generator.generate_from_heightmap(height_map, pixel_size_mm=pixel_size_mm, angle=angle)
+
+                self.finished.emit(job_id, height_map)
+            except ProcessCancelled:
+                continue
+            except Exception as e:
+                self.error.emit(job_id, str(e))
 
 
 class LoadingDialog(QDialog):
@@ -57,9 +96,10 @@ class LoadingDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Processing...")
-        self.setModal(True)
         self.setFixedSize(300, 350)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowCloseButtonHint)
+        # Don't take focus (or a slider's mouse grab) when shown mid-drag
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
 
         layout = QVBoxLayout(self)
         layout.setAlignment(Qt.AlignCenter)
@@ -93,6 +133,8 @@ class LoadingDialog(QDialog):
 class MainWindow(QMainWindow):
     """Main application window"""
 
+    REPROCESS_DELAY_MS = 150  # Changes within this window trigger a single reprocess
+
     def __init__(self):
         super().__init__()
         self.current_process = None
@@ -100,10 +142,24 @@ class MainWindow(QMainWindow):
         self.current_image_file = None
         self.image_processor = ImageProcessor()
         self.stl_generator = STLGenerator()
-        self.worker = None
         self.loading_dialog = None
+        self._job_id = 0  # Id of the latest submitted job; older results are stale
+        self._job_key = None  # (image, crop, process JSON) of the latest job, unless it failed
+
+        # One worker thread serves every reprocess, so only one job ever touches
+        # the shared processor and generator
+        self.worker = ProcessingWorker(self.image_processor, self.stl_generator)
+        self.worker.finished.connect(self._on_processing_finished)
+        self.worker.error.connect(self._on_processing_error)
+        QApplication.instance().aboutToQuit.connect(self.worker.stop)
         self._current_crop = (0.0, 0.0, 1.0, 1.0)  # Normalized crop coords (x, y, w, h)
 
+        # Interactive edits restart this timer; the image is reprocessed once they settle
+        self._reprocess_timer = QTimer(self)
+        self._reprocess_timer.setSingleShot(True)
+        self._reprocess_timer.setInterval(self.REPROCESS_DELAY_MS)
+        self._reprocess_timer.timeout.connect(self._process_image)
+
         self.setWindowTitle("Image to STL Converter")
 
         # Set window to nearly full screen (90% of screen size)
@@ -283,16 +339,21 @@ class MainWindow(QMainWindow):
                 found = True
                 break
 
-        # If no lithophane operation exists, add one
-        if not found:
+        # Update the process editor display (only the changed row if one was replaced)
+        if found:
+            self.process_editor._refresh_rows(i, i + 1)
+        else:
+            # If no lithophane operation exists, add one
             process.add_operation(Operation("set_lithophane_parameters", params))
-
-        # Update the process editor display
-        self.process_editor._refresh_list()
+            self.process_editor._refresh_list()
 
         # Reprocess the image
+        self._schedule_reprocess()
+
+    def _schedule_reprocess(self):
+        """Reprocess the loaded image once the current burst of changes settles"""
         if self.current_image_file:
-            self._process_image()
+            self._reprocess_timer.start()
 
     def _load_random_sample_image(self):
         """Load a random sample image on startup"""
@@ -302,10 +363,7 @@ class MainWindow(QMainWindow):
 
         # Find all image files in samples and subdirectories
         image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff'}
-        image_files = []
-        for ext in image_extensions:
-            image_files.extend(samples_dir.rglob(f"*{ext}"))
-            image_files.extend(samples_dir.rglob(f"*{ext.upper()}"))
+        image_files = [path for path in samples_dir.rglob("*") if path.suffix.lower() in image_extensions]
 
         if not image_files:
             return
@@ -313,6 +371,7 @@ class MainWindow(QMainWindow):
         # Select a random image
         random_image = random.choice(image_files)
         self.current_image_file = str(random_image)
+        self._job_key = None
 
         # Update the original image preview (this triggers processing via crop_changed signal)
         self._update_original_image_preview(self.current_image_file)
@@ -383,13 +442,14 @@ class MainWindow(QMainWindow):
 
         if file_path:
             self.current_image_file = file_path
+            self._job_key = None  # The file may have changed on disk
             self.status_label.setText(f"Loaded image: {Path(file_path).name}")
 
             # Display original image preview
             self._update_original_image_preview(file_path)
 
-            # Automatically process the image
-            self._process_image()
+            # Automatically process the image (coalesced with the crop reset above)
+            self._schedule_reprocess()
 
     def _update_original_image_preview(self, file_path: str):
         """Update the original image preview"""
@@ -405,7 +465,16 @@ class MainWindow(QMainWindow):
         try:
             pil_image = self.image_processor.get_current_image()
             if pil_image is not None:
-                # Convert PIL image to QPixmap
+                # Qt's smooth scaling cost follows the source size, so let PIL
+                # bring large results down to twice the label size first
+                target = self.processed_image_label.size()
+                ratio = min(2 * target.width() / pil_image.width, 2 * target.height() / pil_image.height)
+                if ratio < 1.0:
+                    pil_image = pil_image.resize(
+                        (max(1, round(pil_image.width * ratio)), max(1, round(pil_image.height * ratio))),
+                        Image.Resampling.BILINEAR
+                    )
+
                 if pil_image.mode == 'L':
                     # Grayscale
                     data = pil_image.tobytes()
@@ -418,7 +487,7 @@ class MainWindow(QMainWindow):
                     qimage = QImage(data, rgb_image.width, rgb_image.height,
                                    rgb_image.width * 3, QImage.Format_RGB888)
 
-                pixmap = QPixmap.fromImage(qimage)
+                pixmap = QPixmap.fromImage(qimage, Qt.NoFormatConversion)
                 scaled = pixmap.scaled(
                     self.processed_image_label.size(),
                     Qt.KeepAspectRatio,
@@ -438,51 +507,68 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "Process has no operations")
             return
 
-        # If a worker is already running, wait for it to finish first
-        if self.worker is not None and self.worker.isRunning():
-            self.worker.wait()
-
-        # Show loading dialog
-        self.loading_dialog = LoadingDialog(self)
+        # Nothing to do if the latest job already covers these exact settings
+        # (the process name does not affect the result)
+        data = process.to_dict()
+        key = (self.current_image_file, self._current_crop, json.dumps(data["operations"], sort_keys=True))
+        if key == self._job_key:
+            return
+        self._job_key = key
 
-        # Create and start worker thread with crop coordinates
-        self.worker = ProcessingWorker(
-            self.image_processor,
-            self.stl_generator,
+        # Work on a snapshot so edits made while the job runs cannot race it;
+        # queuing it makes the worker abandon any older job at its next check
+        self._job_id += 1
+        self.worker.submit(
+            self._job_id,
             self.current_image_file,
-            process,
+            Process.from_dict(data),
             crop_rect=self._current_crop
         )
-        self.worker.finished.connect(self._on_processing_finished)
-        self.worker.error.connect(self._on_processing_error)
-        self.worker.start()
+        self.export_stl_btn.setEnabled(False)
 
-        # Show the dialog (blocks until closed)
-        self.loading_dialog.exec()
+        # Show the dialog without blocking the event loop
+        if self.loading_dialog is None:
+            self.loading_dialog = LoadingDialog(self)
+            self.loading_dialog.show()
 
-    def _on_processing_finished(self, height_map):
-        """Handle successful processing completion"""
-        # Close loading dialog
+    def _close_loading_dialog(self):
+        """Close the loading dialog if it is showing"""
         if self.loading_dialog:
-            self.loading_dialog.accept()
+            self.loading_dialog.close()
+            self.loading_dialog.deleteLater()
             self.loading_dialog = None
 
+    def _on_processing_finished(self, job_id: int, height_map):
+        """Handle successful processing completion"""
+        # A newer job is already queued or running; its result will follow
+        if job_id != self._job_id:
+            return
+        self._close_loading_dialog()
+
         # Update processed image preview
         self._update_processed_image_preview()
 
         self.export_stl_btn.setEnabled(True)
         self.status_label.setText("Processing complete. Ready to export STL.")
 
-    def _on_processing_error(self, error_msg):
+    def _on_processing_error(self, job_id: int, error_msg: str):
         """Handle processing error"""
-        # Close loading dialog
-        if self.loading_dialog:
-            self.loading_dialog.reject()
-            self.loading_dialog = None
+        if job_id != self._job_id:
+            return
+        self._job_key = None  # Let the same settings be retried
+        self._close_loading_dialog()
 
         QMessageBox.critical(self, "Error", f"Failed to process image: {error_msg}")
         self.status_label.setText(f"Error: {error_msg}")
 
+    def closeEvent(self, event):
+        """Stop the worker thread before the window goes away"""
+        # Pending debounced changes would otherwise submit after the stop
+        self._reprocess_timer.stop()
+        self.lithophane_controls.cancel_pending()
+        self.worker.stop()
+        super().closeEvent(event)
+
     def _export_stl(self):
         """Export the generated STL file"""
         # Generate default filename from image name + process name
@@ -520,8 +606,7 @@ class MainWindow(QMainWindow):
         self._current_crop = (x, y, w, h)
 
         # Reprocess the image with the new crop
-        if self.current_image_file:
-            self._process_image()
+        self._schedule_reprocess()
 
     def _reset_crop(self):
         """Reset the crop region to full image"""
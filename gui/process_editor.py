@@ -5,9 +5,9 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QListWidget, QListWidgetItem, QDialog, QFormLayout,
     QLineEdit, QComboBox, QDoubleSpinBox, QSpinBox,
-    QCheckBox, QDialogButtonBox, QLabel
+    QCheckBox, QDialogButtonBox, QLabel, QStackedWidget
 )
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Signal, QSignalBlocker, QTimer
 from core.process import Process, Operation
 
 
@@ -36,11 +36,12 @@ class OperationDialog(QDialog):
     def __init__(self, operation: Operation = None, parent=None):
         super().__init__(parent)
         self.operation = operation
-        self.param_widgets = {}
+        self.param_widgets = {}  # name -> (widget, getter, setter)
+        self._pages = {}  # op_type -> (page, param_widgets), built on first use
 
-        self.setWindowTitle("Edit Operation" if operation else "Add Operation")
         self.setModal(True)
         self._setup_ui()
+        self.set_operation(operation)
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -55,9 +56,9 @@ class OperationDialog(QDialog):
         type_layout.addWidget(self.type_combo)
         layout.addLayout(type_layout)
 
-        # Parameters form
-        self.param_form = QFormLayout()
-        layout.addLayout(self.param_form)
+        # One parameters form per operation type
+        self.param_stack = QStackedWidget()
+        layout.addWidget(self.param_stack)
 
         # Buttons
         button_box = QDialogButtonBox(
@@ -67,83 +68,83 @@ class OperationDialog(QDialog):
         button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
 
-        # Load existing operation if editing
-        if self.operation:
-            for i in range(self.type_combo.count()):
-                if self.type_combo.itemData(i) == self.operation.type:
-                    self.type_combo.setCurrentIndex(i)
-                    break
-        else:
-            self._update_parameters()
+    def set_operation(self, operation: Operation = None):
+        """Load an operation to edit, or the defaults for a new one"""
+        self.operation = operation
+        self.setWindowTitle("Edit Operation" if operation else "Add Operation")
 
-    def _update_parameters(self):
-        """Update parameter fields based on selected operation type"""
-        # Clear existing parameter widgets
-        while self.param_form.rowCount() > 0:
-            self.param_form.removeRow(0)
-        self.param_widgets.clear()
+        # A new operation starts on the first type, like a freshly built dialog
+        index = self.type_combo.findData(operation.type) if operation else 0
+        if index >= 0:
+            with QSignalBlocker(self.type_combo):
+                self.type_combo.setCurrentIndex(index)
+        self._update_parameters()
 
+    def _update_parameters(self):
+        """Show the parameter fields for the selected operation type"""
         # Get current operation type
         op_type = self.type_combo.currentData()
         if not op_type:
             return
 
-        op_info = self.OPERATION_TYPES[op_type]
+        if op_type not in self._pages:
+            self._pages[op_type] = self._build_page(op_type)
+        page, self.param_widgets = self._pages[op_type]
+        self.param_stack.setCurrentWidget(page)
 
-        # Create widgets for each parameter
-        for param_name, param_info in op_info["parameters"].items():
-            label = param_info["label"]
-            param_type = param_info["type"]
-
-            # Get current value if editing
+        # Fill in the current values if editing, defaults otherwise
+        for param_name, param_info in self.OPERATION_TYPES[op_type]["parameters"].items():
             if self.operation and param_name in self.operation.parameters:
                 current_value = self.operation.parameters[param_name]
             else:
                 current_value = param_info["default"]
 
-            # Create appropriate widget based on type
+            widget, _, set_value = self.param_widgets[param_name]
+            set_value(widget, current_value)
+
+    def _build_page(self, op_type: str) -> tuple:
+        """Create the parameter form for an operation type"""
+        page = QWidget()
+        form = QFormLayout(page)
+        form.setContentsMargins(0, 0, 0, 0)
+        param_widgets = {}
+
+        # Create widgets for each parameter
+        for param_name, param_info in self.OPERATION_TYPES[op_type]["parameters"].items():
+            label = param_info["label"]
+            param_type = param_info["type"]
+
+            # Create appropriate widget based on type, with its value accessors
             if param_type == "int":
                 widget = QSpinBox()
                 widget.setRange(0, 10000)
-                widget.setValue(current_value)
-                self.param_widgets[param_name] = widget
+                accessors = (QSpinBox.value, QSpinBox.setValue)
             elif param_type == "float":
                 widget = QDoubleSpinBox()
                 widget.setRange(0.0, 1000.0)
                 widget.setDecimals(2)
-                widget.setValue(current_value)
-                self.param_widgets[param_name] = widget
+                accessors = (QDoubleSpinBox.value, QDoubleSpinBox.setValue)
             elif param_type == "bool":
                 widget = QCheckBox()
-                widget.setChecked(current_value)
-                self.param_widgets[param_name] = widget
+                accessors = (QCheckBox.isChecked, QCheckBox.setChecked)
             elif param_type == "combo":
                 widget = QComboBox()
                 widget.addItems(param_info["options"])
-                widget.setCurrentText(str(current_value))
-                self.param_widgets[param_name] = widget
+                accessors = (QComboBox.currentText, lambda w, value: w.setCurrentText(str(value)))
             else:
-                widget = QLineEdit(str(current_value))
-                self.param_widgets[param_name] = widget
+                widget = QLineEdit()
+                accessors = (QLineEdit.text, lambda w, value: w.setText(str(value)))
+            param_widgets[param_name] = (widget, *accessors)
+
+            form.addRow(label + ":", widget)
 
-            self.param_form.addRow(label + ":", widget)
+        self.param_stack.addWidget(page)
+        return page, param_widgets
 
     def get_operation(self) -> Operation:
         """Get the operation from the dialog"""
         op_type = self.type_combo.currentData()
-        parameters = {}
-
-        for param_name, widget in self.param_widgets.items():
-            if isinstance(widget, QSpinBox):
-                parameters[param_name] = widget.value()
-            elif isinstance(widget, QDoubleSpinBox):
-                parameters[param_name] = widget.value()
-            elif isinstance(widget, QCheckBox):
-                parameters[param_name] = widget.isChecked()
-            elif isinstance(widget, QComboBox):
-                parameters[param_name] = widget.currentText()
-            elif isinstance(widget, QLineEdit):
-                parameters[param_name] = widget.text()
+        parameters = {name: get_value(widget) for name, (widget, get_value, _) in self.param_widgets.items()}
 
         return Operation(op_type, parameters)
 
@@ -153,9 +154,19 @@ class ProcessEditor(QWidget):
 
     process_changed = Signal()
 
+    NAME_EMIT_DELAY_MS = 150  # Typing the name emits process_changed once it pauses
+    LABEL_CACHE_SIZE = 256  # Formatted labels kept before the cache starts over
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.process = Process()
+        self._operation_dialog = None
+        self._label_cache = {}  # Labels without their position, by _label_key
+
+        self._name_timer = QTimer(self)
+        self._name_timer.setSingleShot(True)
+        self._name_timer.setInterval(self.NAME_EMIT_DELAY_MS)
+        self._name_timer.timeout.connect(self.process_changed.emit)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -202,7 +213,10 @@ class ProcessEditor(QWidget):
     def set_process(self, process: Process):
         """Set the process to edit"""
         self.process = process
-        self.name_edit.setText(process.name)
+        # Loading is not an edit, so the name box must not report it
+        self._name_timer.stop()
+        with QSignalBlocker(self.name_edit):
+            self.name_edit.setText(process.name)
         self._refresh_list()
 
     def get_process(self) -> Process:
@@ -211,25 +225,68 @@ class ProcessEditor(QWidget):
 
     def _refresh_list(self):
         """Refresh the operations list"""
-        self.operations_list.clear()
-        for i, operation in enumerate(self.process.operations):
-            op_info = OperationDialog.OPERATION_TYPES.get(operation.type, {})
-            op_name = op_info.get("name", operation.type)
-            item_text = f"{i+1}. {op_name}"
-
-            # Add some parameter info
-            if operation.type == "set_lithophane_parameters":
-                item_text += f" ({operation.parameters.get('width_mm')}x{operation.parameters.get('height_mm')}mm, {operation.parameters.get('min_thickness_mm')}-{operation.parameters.get('max_thickness_mm')}mm)"
-
-            self.operations_list.addItem(item_text)
+        items = [self._format_op_item(i, operation) for i, operation in enumerate(self.process.operations)]
+
+        # Repopulate in one batch, without per-row selection signals, and repaint once
+        self.operations_list.setUpdatesEnabled(False)
+        try:
+            with QSignalBlocker(self.operations_list):
+                self.operations_list.clear()
+                self.operations_list.addItems(items)
+        finally:
+            self.operations_list.setUpdatesEnabled(True)
+
+    def _refresh_rows(self, start: int, stop: int = None):
+        """Re-label rows start..stop-1 (to the end by default) in place"""
+        operations = self.process.operations
+        for row in range(start, len(operations) if stop is None else stop):
+            self.operations_list.item(row).setText(self._format_op_item(row, operations[row]))
+
+    def _format_op_item(self, i: int, operation: Operation) -> str:
+        """List text for the operation at position i"""
+        key = self._label_key(operation)
+        label = self._label_cache.get(key)
+        if label is None:
+            if len(self._label_cache) >= self.LABEL_CACHE_SIZE:
+                self._label_cache.clear()
+            label = self._label_cache[key] = self._format_label(operation)
+        return f"{i+1}. {label}"
+
+    @staticmethod
+    def _label_key(operation: Operation) -> tuple:
+        """The values a list label depends on"""
+        if operation.type == "set_lithophane_parameters":
+            params = operation.parameters
+            return (operation.type, params.get('width_mm'), params.get('height_mm'),
+                    params.get('min_thickness_mm'), params.get('max_thickness_mm'))
+        return (operation.type,)
+
+    @staticmethod
+    def _format_label(operation: Operation) -> str:
+        """List label for an operation, without its position"""
+        op_info = OperationDialog.OPERATION_TYPES.get(operation.type, {})
+        label = op_info.get("name", operation.type)
+
+        # Add some parameter info
+        if operation.type == "set_lithophane_parameters":
+            label += f" ({operation.parameters.get('width_mm')}x{operation.parameters.get('height_mm')}mm, {operation.parameters.get('min_thickness_mm')}-{operation.parameters.get('max_thickness_mm')}mm)"
+        return label
+
+    def _open_operation_dialog(self, operation: Operation = None) -> OperationDialog:
+        """Get the shared operation dialog loaded with an operation (or defaults)"""
+        if self._operation_dialog is None:
+            self._operation_dialog = OperationDialog(operation, parent=self)
+        else:
+            self._operation_dialog.set_operation(operation)
+        return self._operation_dialog
 
     def _add_operation(self):
         """Add a new operation"""
-        dialog = OperationDialog(parent=self)
+        dialog = self._open_operation_dialog()
         if dialog.exec():
             operation = dialog.get_operation()
             self.process.add_operation(operation)
-            self._refresh_list()
+            self.operations_list.addItem(self._format_op_item(len(self.process.operations) - 1, operation))
             self.process_changed.emit()
 
     def _edit_operation(self):
@@ -237,11 +294,11 @@ class ProcessEditor(QWidget):
         current_row = self.operations_list.currentRow()
         if current_row >= 0:
             operation = self.process.operations[current_row]
-            dialog = OperationDialog(operation, parent=self)
+            dialog = self._open_operation_dialog(operation)
             if dialog.exec():
                 new_operation = dialog.get_operation()
                 self.process.operations[current_row] = new_operation
-                self._refresh_list()
+                self._refresh_rows(current_row, current_row + 1)
                 self.process_changed.emit()
 
     def _remove_operation(self):
@@ -249,7 +306,8 @@ class ProcessEditor(QWidget):
         current_row = self.operations_list.currentRow()
         if current_row >= 0:
             self.process.remove_operation(current_row)
-            self._refresh_list()
+            self.operations_list.takeItem(current_row)
+            self._refresh_rows(current_row)  # Renumber the rows that moved up
             self.process_changed.emit()
 
     def _move_up(self):
@@ -257,7 +315,7 @@ class ProcessEditor(QWidget):
         current_row = self.operations_list.currentRow()
         if current_row > 0:
             self.process.move_operation(current_row, current_row - 1)
-            self._refresh_list()
+            self._refresh_rows(current_row - 1, current_row + 1)
             self.operations_list.setCurrentRow(current_row - 1)
             self.process_changed.emit()
 
@@ -266,11 +324,11 @@ class ProcessEditor(QWidget):
         current_row = self.operations_list.currentRow()
         if current_row >= 0 and current_row < len(self.process.operations) - 1:
             self.process.move_operation(current_row, current_row + 1)
-            self._refresh_list()
+            self._refresh_rows(current_row, current_row + 2)
             self.operations_list.setCurrentRow(current_row + 1)
             self.process_changed.emit()
 
     def _on_name_changed(self, text: str):
         """Handle process name change"""
         self.process.name = text
-        self.process_changed.emit()
+        self._name_timer.start()
@@ -0,0 +1,7 @@
+"""
+Shared pytest setup: make the project packages importable from the tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
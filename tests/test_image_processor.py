@@ -0,0 +1,144 @@
+"""
+Tests for image processing and border textures
+"""
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from core.image_processor import ImageProcessor
+from core.process import Operation, Process
+
+
+def make_image(h: int = 60, w: int = 80, value: float = 128.0) -> np.ndarray:
+    """Helper to build a flat float32 grayscale image array"""
+    return np.full((h, w), value, dtype=np.float32)
+
+
+class TestApplyBorder:
+    """Test the decorative border textures"""
+
+    @pytest.mark.parametrize("texture", ImageProcessor.BORDER_TEXTURES)
+    def test_interior_untouched(self, texture):
+        """Pixels farther than the border width from every edge keep their value"""
+        result = ImageProcessor()._apply_border(make_image(), 10, 1.0, texture)
+
+        assert result.shape == (60, 80)
+        assert (result[10:-10, 10:-10] == 128).all(), f"{texture} border modified the interior"
+
+    def test_solid_border_value(self):
+        """A solid border at full intensity is black along every edge"""
+        result = ImageProcessor()._apply_border(make_image(), 5, 1.0, "solid")
+
+        assert (result[:5, :] == 0).all()
+        assert (result[-5:, :] == 0).all()
+        assert (result[:, :5] == 0).all()
+        assert (result[:, -5:] == 0).all()
+
+    def test_gradient_fades_inward(self):
+        """A gradient border starts at the border value and fades toward the image"""
+        result = ImageProcessor()._apply_border(make_image(value=255.0), 10, 1.0, "gradient")
+
+        row = result[30, :10].astype(int)
+        assert row[0] == 0
+        assert (np.diff(row) >= 0).all(), "Gradient border should get lighter toward the interior"
+
+    def test_zero_width_is_noop(self):
+        """A zero-width border leaves the image unchanged"""
+        result = ImageProcessor()._apply_border(make_image(), 0, 1.0, "solid")
+        assert (result == 128).all()
+
+    def test_unknown_texture_is_noop(self):
+        """An unknown texture leaves the image unchanged without building the mask"""
+        processor = ImageProcessor()
+        result = processor._apply_border(make_image(), 10, 1.0, "bogus")
+        assert (result == 128).all()
+        assert not processor._mask_cache
+
+
+class TestLithophaneParameters:
+    """Test the height map produced by set_lithophane_parameters"""
+
+    def run(self, image: np.ndarray, **params) -> ImageProcessor:
+        processor = ImageProcessor()
+        processor.current_image = Image.fromarray(image, mode='L')
+        parameters = {"width_mm": 20.0, "height_mm": 10.0, "pixels_per_mm": 2.0,
+                      "min_thickness_mm": 0.8, "max_thickness_mm": 5.0}
+        parameters.update(params)
+        processor._execute_operation(Operation("set_lithophane_parameters", parameters))
+        return processor
+
+    def test_invert_mirrors_thickness(self):
+        """Inverting swaps thin and thick so the two height maps sum to min + max"""
+        image = np.random.default_rng(0).integers(0, 256, (20, 40), dtype=np.uint8)
+        plain = self.run(image).get_height_map()
+        inverted = self.run(image, invert=True)
+
+        np.testing.assert_allclose(plain + inverted.get_height_map(), 5.8, atol=1e-4)
+        assert (np.asarray(inverted.get_current_image()) == 255 - image).all()
+
+    def test_keep_full_image_pads_with_background(self):
+        """A wide image is letterboxed with the tinted background above and below"""
+        image = np.zeros((10, 40), dtype=np.uint8)
+        processor = self.run(image, crop_mode="keep_full_image", background_tint=20.0)
+        result = np.asarray(processor.get_current_image())
+
+        assert result.shape == (20, 40)
+        assert (result[:4] == 204).all() and (result[-4:] == 204).all()
+        assert (result[8:12] == 0).all()
+
+    def test_crop_to_size_ignores_cropped_pixels(self):
+        """Pixels cut away by the aspect crop do not bleed into the edges of the result"""
+        image = np.full((100, 200), 255, dtype=np.uint8)
+        image[:, 50:150] = 0
+        processor = self.run(image, width_mm=20.0, height_mm=20.0)
+
+        assert (np.asarray(processor.get_current_image()) == 0).all()
+
+    def test_border_height_matches_preview(self):
+        """With a fractional border the height map is built from the 8-bit preview values"""
+        image = np.random.default_rng(3).integers(0, 256, (20, 40), dtype=np.uint8)
+        processor = self.run(image, border_width_mm=3.0, border_texture="gradient", border_intensity=37.0)
+        preview = np.asarray(processor.get_current_image()).astype(np.float32)
+
+        np.testing.assert_allclose(processor.get_height_map(), preview * (-4.2 / 255) + 5.0, atol=1e-5)
+
+    def test_gray_to_height_blocks_match_single_pass(self, monkeypatch):
+        """Blocked affine transform matches a whole-array multiply-add"""
+        gray = np.random.default_rng(1).integers(0, 256, (37, 23), dtype=np.uint8)
+        monkeypatch.setattr(ImageProcessor, "AFFINE_BLOCK_PIXELS", 100)
+
+        result = ImageProcessor()._gray_to_height(gray, -0.02, 5.0)
+
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, gray * -0.02 + 5.0, atol=1e-5)
+
+
+class TestExecuteProcess:
+    """Test running a whole process"""
+
+    def test_reruns_reuse_decoded_source(self, tmp_path):
+        """Re-running on the same file decodes it once; rewriting the file is picked up"""
+        path = tmp_path / "image.png"
+        Image.fromarray(np.zeros((30, 50), dtype=np.uint8), mode='L').save(path)
+        process = Process()
+        process.add_operation(Operation("set_lithophane_parameters", {
+            "width_mm": 20, "height_mm": 10, "pixels_per_mm": 2,
+        }))
+        processor = ImageProcessor()
+
+        first = processor.execute_process(str(path), process).copy()
+        decoded = processor._decoded[1]
+        processor.execute_process(str(path), process)
+        assert processor._decoded[1] is decoded
+
+        Image.fromarray(np.full((30, 50), 255, dtype=np.uint8), mode='L').save(path)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+        second = processor.execute_process(str(path), process)
+        assert processor._decoded[1] is not decoded
+        assert second.mean() < first.mean()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
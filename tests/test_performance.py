@@ -1,25 +1,31 @@
 """
 Performance tests for STL generation
 """
-import sys
 import time
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
 import pytest
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from core.image_processor import ImageProcessor
 from core.process import Process
 from core.stl_generator import STLGenerator
 
 
+@lru_cache(maxsize=4)
+def synthetic_heightmap(shape: tuple, low: float, high: float, seed: int) -> np.ndarray:
+    """Seeded random float32 heightmap, built once per set of arguments"""
+    height_map = np.random.default_rng(seed).uniform(low, high, shape).astype(np.float32)
+    height_map.setflags(write=False)  # Shared between calls
+    return height_map
+
+
 def get_sample_image() -> Path:
     """Get a sample image for testing"""
     samples_dir = Path(__file__).parent.parent / "samples"
-    images = list(samples_dir.rglob("*.jpg"))
-    return images[0] if images else None
+    # Only the first match is needed, so stop the walk there
+    return next(samples_dir.rglob("*.jpg"), None)
 
 
 class TestPerformance:
@@ -29,6 +35,7 @@ class TestPerformance:
     THRESHOLD_FLAT = 2.0        # angle=0, simplified mesh
     THRESHOLD_ANGLED = 10.0     # angle=75, full processing
 
+    @pytest.mark.slow
     def test_generation_time_flat(self):
         """Mesh generation at angle=0 should complete within threshold"""
         test_image = get_sample_image()
@@ -66,6 +73,7 @@ class TestPerformance:
         assert elapsed < self.THRESHOLD_FLAT, \
             f"Generation took {elapsed:.2f}s, threshold is {self.THRESHOLD_FLAT}s"
 
+    @pytest.mark.slow
     def test_generation_time_angled_default(self):
         """Mesh generation at default angle (75°) should complete within threshold"""
         test_image = get_sample_image()
@@ -108,8 +116,7 @@ class TestPerformance:
     def test_stl_generator_only(self):
         """Test just the STL generation step (no image processing)"""
         # 300x300 heightmap matches default 75mm at 4 pixels/mm
-        np.random.seed(42)
-        height_map = np.random.uniform(0.8, 2.5, (300, 300))
+        height_map = synthetic_heightmap((300, 300), 0.8, 2.5, 42)
         pixel_size = 75.0 / 299  # fence-post corrected
 
         generator = STLGenerator()
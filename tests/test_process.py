@@ -0,0 +1,52 @@
+"""
+Tests for process serialization
+"""
+from pathlib import Path
+
+import pytest
+
+from core import process as process_module
+from core.process import Process, Operation
+
+
+def make_process() -> Process:
+    """Helper to build a process with a lithophane operation"""
+    process = Process("Round Trip")
+    process.add_operation(Operation("set_lithophane_parameters", {
+        'width_mm': 75.0,
+        'height_mm': 60.5,
+        'angle': 75.0,
+        'crop_mode': 'keep_full_image',
+        'invert': True
+    }))
+    return process
+
+
+class TestProcessPersistence:
+    """Test saving and loading processes"""
+
+    def test_save_load_round_trip(self, tmp_path):
+        """A saved process loads back with the same name and operations"""
+        path = tmp_path / "process.json"
+        make_process().save(path)
+
+        loaded = Process.load(path)
+        assert loaded.to_dict() == make_process().to_dict()
+
+    def test_load_default_process(self):
+        """The bundled default process loads"""
+        default_path = Path(__file__).parent.parent / "processes" / "default.json"
+        process = Process.load(default_path)
+        assert process.operations[0].type == "set_lithophane_parameters"
+
+    def test_round_trip_without_orjson(self, tmp_path, monkeypatch):
+        """The standard library fallback writes the same data"""
+        monkeypatch.setattr(process_module, "orjson", None)
+        path = tmp_path / "process.json"
+        make_process().save(path)
+
+        assert Process.load(path).to_dict() == make_process().to_dict()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,163 +1,163 @@
 """
 Tests to verify STL meshes are manifold (watertight)
 """
+import os
 import random
-import sys
-import tempfile
 from pathlib import Path
 
 import numpy as np
 import pytest
-import trimesh
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-
-def get_random_sample_image() -> Path:
-    """Get a random image from the samples directory"""
-    samples_dir = Path(__file__).parent.parent / "samples"
-    images = list(samples_dir.rglob("*.jpg"))
-    if not images:
-        return None
-    return random.choice(images)
+from PIL import Image
+from stl import mesh as stl_mesh
 
 from core.image_processor import ImageProcessor
 from core.process import Process
 from core.stl_generator import STLGenerator
 
 
-def generate_stl_from_image(image_path: str, angle: float = 0.0) -> trimesh.Trimesh:
-    """Helper to generate STL from an image and load it as trimesh"""
-    process = Process.from_dict({
-        'name': 'Test',
-        'operations': [{
-            'type': 'set_lithophane_parameters',
-            'parameters': {
-                'width_mm': 50.0,
-                'height_mm': 50.0,
-                'min_thickness_mm': 0.4,
-                'max_thickness_mm': 2.0,
-                'angle': angle
-            }
-        }]
-    })
+def _can_open(path: Path) -> bool:
+    """Whether Pillow recognizes the file (some samples are failed downloads saved as .jpg)"""
+    try:
+        Image.open(path).close()
+    except OSError:
+        return False
+    return True
 
-    processor = ImageProcessor()
-    processor.execute_process(image_path, process)
 
-    generator = STLGenerator()
-    stl_mesh = generator.generate_from_heightmap(
-        processor.get_height_map(),
-        pixel_size_mm=processor.get_pixel_size_mm(),
-        angle=angle
-    )
+# Scanned once when the module is collected, sorted so picks do not depend on the filesystem
+SAMPLE_IMAGES = sorted(p for p in (Path(__file__).parent.parent / "samples").rglob("*.jpg") if _can_open(p))
 
-    # Save to temp file and load with trimesh
-    with tempfile.NamedTemporaryFile(suffix='.stl', delete=False) as f:
-        temp_path = f.name
-    stl_mesh.save(temp_path)
+# Seeded (per pytest-xdist worker, if any) so every run picks the same images
+_RNG = random.Random(int(os.environ.get("PYTEST_XDIST_WORKER", "gw0")[2:] or 0))
 
-    mesh = trimesh.load(temp_path)
-    Path(temp_path).unlink()
 
-    return mesh
+def get_random_sample_image() -> Path:
+    """Get a random image from the samples directory"""
+    if not SAMPLE_IMAGES:
+        return None
+    return _RNG.choice(SAMPLE_IMAGES)
+
 
+# Shared by the helpers below; each run overwrites their per-image state and
+# the processor's keyed caches carry over between tests
+PROCESSOR = ImageProcessor()
+GENERATOR = STLGenerator()
 
-def generate_stl_from_heightmap(height_map: np.ndarray, pixel_size_mm: float = 0.5, angle: float = 0.0) -> trimesh.Trimesh:
-    """Helper to generate STL from a synthetic heightmap"""
-    generator = STLGenerator()
-    stl_mesh = generator.generate_from_heightmap(
+
+def is_watertight(result: stl_mesh.Mesh) -> bool:
+    """Whether every edge is shared by exactly two triangles, checked with two sorts"""
+    # Weld corners that agree to 1e-6 mm into vertex indices
+    corners = np.round(result.vectors.reshape(-1, 3) / 1e-6).astype(np.int64)
+    _, inverse = np.unique(corners, axis=0, return_inverse=True)
+    faces = inverse.reshape(-1, 3)
+    # Each triangle contributes edges (0, 1), (1, 2) and (2, 0), direction ignored
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return bool((counts == 2).all())
+
+
+def generate_stl_from_heightmap(height_map: np.ndarray, pixel_size_mm: float = 0.5, angle: float = 0.0) -> stl_mesh.Mesh:
+    """Helper to generate STL from a heightmap"""
+    return GENERATOR.generate_from_heightmap(
         height_map,
         pixel_size_mm=pixel_size_mm,
         angle=angle
     )
 
-    with tempfile.NamedTemporaryFile(suffix='.stl', delete=False) as f:
-        temp_path = f.name
-    stl_mesh.save(temp_path)
 
-    mesh = trimesh.load(temp_path)
-    Path(temp_path).unlink()
+@pytest.fixture(scope="module")
+def flat_mesh():
+    """Flat 1 mm heightmap meshes by (size, angle), each generated once per module"""
+    cache = {}
+
+    def get(size: int, angle: float) -> stl_mesh.Mesh:
+        if (size, angle) not in cache:
+            height_map = np.ones((size, size), dtype=np.float32)
+            cache[size, angle] = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=angle)
+        return cache[size, angle]
 
-    return mesh
+    return get
+
+
+@pytest.fixture(scope="module")
+def sample_height_map():
+    """Name, height map and pixel size of one sample image, processed once per module"""
+    test_image = get_random_sample_image()
+    if not test_image:
+        pytest.skip("No sample images found")
+
+    # The height map does not depend on the build angle, only the mesh does
+    process = Process.from_dict({
+        'name': 'Test',
+        'operations': [{
+            'type': 'set_lithophane_parameters',
+            'parameters': {
+                'width_mm': 50.0,
+                'height_mm': 50.0,
+                'min_thickness_mm': 0.4,
+                'max_thickness_mm': 2.0
+            }
+        }]
+    })
+    PROCESSOR.execute_process(str(test_image), process)
+    return test_image.name, PROCESSOR.get_height_map(), PROCESSOR.get_pixel_size_mm()
 
 
 class TestSTLManifold:
     """Test that generated STL meshes are manifold"""
 
-    def test_simple_flat_heightmap_is_manifold(self):
-        """A simple flat heightmap should produce a manifold mesh"""
-        # Create a simple 10x10 flat heightmap
-        height_map = np.ones((10, 10)) * 1.0
-        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=0.0)
+    @pytest.mark.parametrize("angle", [-30.0, 0.0, 45.0, 75.0, 90.0])
+    def test_flat_heightmap_is_manifold(self, flat_mesh, angle):
+        """A flat heightmap should produce a manifold mesh at any build angle"""
+        mesh = flat_mesh(10, angle)
 
-        assert mesh.is_watertight, f"Mesh is not watertight. Has {len(mesh.faces)} faces."
+        assert is_watertight(mesh), f"Mesh at {angle}° is not watertight. Has {len(mesh.vectors)} faces."
 
     def test_gradient_heightmap_is_manifold(self):
         """A gradient heightmap should produce a manifold mesh"""
         # Create a gradient heightmap
-        height_map = np.linspace(0.5, 2.0, 100).reshape(10, 10)
+        height_map = np.linspace(0.5, 2.0, 100, dtype=np.float32).reshape(10, 10)
         mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=0.0)
 
-        assert mesh.is_watertight, f"Mesh is not watertight. Has {len(mesh.faces)} faces."
+        assert is_watertight(mesh), f"Mesh is not watertight. Has {len(mesh.vectors)} faces."
 
     def test_random_heightmap_is_manifold(self):
         """A random heightmap should produce a manifold mesh"""
         np.random.seed(42)
-        height_map = np.random.uniform(0.4, 2.0, (20, 20))
+        height_map = np.random.uniform(0.4, 2.0, (20, 20)).astype(np.float32)
         mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=0.5, angle=0.0)
 
-        assert mesh.is_watertight, f"Mesh is not watertight. Has {len(mesh.faces)} faces."
+        assert is_watertight(mesh), f"Mesh is not watertight. Has {len(mesh.vectors)} faces."
 
-    def test_flat_heightmap_angled_is_manifold(self):
-        """A flat heightmap at 45 degrees should produce a manifold mesh"""
-        height_map = np.ones((10, 10)) * 1.0
-        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=45.0)
+    def test_open_mesh_is_not_manifold(self, flat_mesh):
+        """Dropping a single triangle leaves edges with only one neighbour"""
+        mesh = flat_mesh(10, 0.0)
+        opened = stl_mesh.Mesh(mesh.data[1:].copy())
 
-        assert mesh.is_watertight, f"Mesh at 45° is not watertight."
+        assert not is_watertight(opened)
 
-    def test_flat_heightmap_75deg_is_manifold(self):
-        """A flat heightmap at 75 degrees (default) should produce a manifold mesh"""
-        height_map = np.ones((10, 10)) * 1.0
-        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=75.0)
-
-        assert mesh.is_watertight, f"Mesh at 75° is not watertight."
-
-    def test_flat_heightmap_90deg_is_manifold(self):
-        """A flat heightmap at 90 degrees (vertical) should produce a manifold mesh"""
-        height_map = np.ones((10, 10)) * 1.0
-        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=90.0)
 
-        assert mesh.is_watertight, f"Mesh at 90° is not watertight."
+@pytest.mark.slow
+class TestRealImageManifold:
+    """Test that meshes from real sample images are manifold"""
 
-    def test_real_image_is_manifold(self):
-        """Test with a random sample image"""
-        test_image = get_random_sample_image()
-        if not test_image:
-            pytest.skip("No sample images found")
+    @pytest.mark.parametrize("angle", [0.0, 75.0])
+    def test_real_image_is_manifold(self, sample_height_map, angle):
+        """Test with a random sample image, flat and at the default angle"""
+        name, height_map, pixel_size_mm = sample_height_map
+        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=pixel_size_mm, angle=angle)
 
-        mesh = generate_stl_from_image(str(test_image), angle=0.0)
-        assert mesh.is_watertight, f"Mesh from {test_image.name} is not watertight."
-
-    def test_real_image_angled_is_manifold(self):
-        """Test with a random sample image at an angle"""
-        test_image = get_random_sample_image()
-        if not test_image:
-            pytest.skip("No sample images found")
-
-        mesh = generate_stl_from_image(str(test_image), angle=75.0)
-        assert mesh.is_watertight, f"Mesh from {test_image.name} at 75° is not watertight."
+        assert is_watertight(mesh), f"Mesh from {name} at {angle}° is not watertight."
 
 
 class TestMeshTriangleCount:
     """Test that mesh simplification actually reduces triangle count"""
 
-    def test_bottom_face_simplified_at_angle_0(self):
+    def test_bottom_face_simplified_at_angle_0(self, flat_mesh):
         """Bottom face should only have 2 triangles for angle=0 builds"""
-        # Create heightmaps of different sizes
+        # Flat heightmaps of different sizes
         for size in [10, 20, 50]:
-            height_map = np.ones((size, size)) * 1.0
-            mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=0.0)
+            triangles = len(flat_mesh(size, 0.0).vectors)
 
             # Expected triangles with simplified bottom and fan side walls:
             # - Top: (size-1)^2 * 2 (full grid needed for detail)
@@ -168,16 +168,15 @@ class TestMeshTriangleCount:
             side_tris = 4 * size
             expected = top_tris + bottom_tris + side_tris
 
-            assert len(mesh.faces) == expected, \
-                f"Size {size} at angle=0: expected {expected} faces, got {len(mesh.faces)}"
+            assert triangles == expected, \
+                f"Size {size} at angle=0: expected {expected} faces, got {triangles}"
 
-    def test_angled_builds_use_grid_bottom(self):
+    def test_angled_builds_use_grid_bottom(self, flat_mesh):
         """Angled builds should use full grid for proper clamping"""
         size = 10
-        height_map = np.ones((size, size)) * 1.0
 
         # For angled builds, we use full grid (more triangles but handles clamping)
-        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=75.0)
+        triangles = len(flat_mesh(size, 75.0).vectors)
 
         # Should have more faces than simplified version
         # Full grid: top + bottom + sides = 2*(size-1)^2 * 2 + 4*(size-1)*2
@@ -188,8 +187,46 @@ class TestMeshTriangleCount:
 
         # Note: some triangles may be removed as degenerate after clamping
         # so actual count may be slightly less
-        assert len(mesh.faces) <= expected_full, \
-            f"Angled mesh has more faces than expected: {len(mesh.faces)} > {expected_full}"
+        assert triangles <= expected_full, \
+            f"Angled mesh has more faces than expected: {triangles} > {expected_full}"
+
+    def test_single_row_grid_bottom(self):
+        """A one-row heightmap still gets its front and back walls at angled builds"""
+        height_map = np.ones((1, 5), dtype=np.float32)
+        mesh = generate_stl_from_heightmap(height_map, pixel_size_mm=1.0, angle=90.0)
+
+        # Bottom fan plus front and back walls, 2 * (cols - 1) triangles each
+        assert len(mesh.vectors) == 3 * 2 * 4
+
+
+class TestMeshCleanup:
+    """Test the passes that tidy up the mesh after clamping"""
+
+    def make_mesh(self, triangles) -> stl_mesh.Mesh:
+        result = stl_mesh.Mesh(np.zeros(len(triangles), dtype=stl_mesh.Mesh.dtype))
+        result.vectors[:] = np.array(triangles, dtype=np.float32)
+        return result
+
+    def test_duplicate_faces_removed_regardless_of_order(self):
+        """Faces with the same corners in any order are kept only once, in first-seen order"""
+        a = [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+        b = [[0, 0, 1], [1, 0, 0], [0, 1, 0]]
+        source = self.make_mesh([a, b, [a[1], a[2], a[0]], b])
+
+        result = STLGenerator()._remove_duplicate_faces(source)
+
+        assert len(result.vectors) == 2
+        np.testing.assert_array_equal(result.vectors, np.array([a, b], dtype=np.float32))
+
+    def test_degenerate_triangles_removed(self):
+        """Triangles with two coincident corners are dropped"""
+        good = [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+        collapsed = [[0, 0, 0], [1, 0, 0], [1, 0, 0]]
+        source = self.make_mesh([collapsed, good, collapsed])
+
+        result = STLGenerator()._remove_degenerate_triangles(source)
+
+        np.testing.assert_array_equal(result.vectors, np.array([good], dtype=np.float32))
 
 
 if __name__ == "__main__":